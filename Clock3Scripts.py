@@ -1,15 +1,26 @@
+import logging, time
+# Startup is timed from here so the imports below are included
+_import_start = time.perf_counter()
+
 from . import commands
 from .lib import fusion360utils as futil
 
-from . import config
+from . import config, logger
+
+log = logging.getLogger(__name__)
 
 def run(context):
     try:
+        start = time.perf_counter()
+        logger.start()
         ui = futil.app.userInterface
         workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
         workspace.toolbarPanels.add(config.PANEL_ID, config.PANEL_NAME,
                                             config.PANEL_BESIDE_ID, False)
         commands.start()
+        end = time.perf_counter()
+        log.info('%s started in %.1f ms (run: %.1f ms)', config.ADDIN_NAME, (end - _import_start) * 1000,
+                 (end - start) * 1000)
     except:
         futil.handle_error('run')
 
@@ -24,4 +35,6 @@ def stop(context):
         panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
         panel.deleteMe()
     except:
-        futil.handle_error('stop')
\ No newline at end of file
+        futil.handle_error('stop')
+    finally:
+        logger.stop()
\ No newline at end of file
@@ -0,0 +1,250 @@
+#fake_adsk.py
+#
+# In-process stand-ins for the parts of `adsk.core` and `adsk.fusion` the add-in touches, so its
+# modules can be imported and timed outside Fusion. Only the behavior the benchmarks need is
+# modeled; any other name resolves to a placeholder class so type annotations still import.
+#
+# Call `install()` before importing any add-in module.
+
+import sys, types
+
+class _Placeholder:
+    @classmethod
+    def cast(cls, obj):
+        return obj
+
+    @classmethod
+    def classType(cls) -> str:
+        return cls.__name__
+
+def _module(name: str, defined: dict) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(defined)
+    def __getattr__(attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        placeholder = type(attr, (_Placeholder,), {})
+        setattr(module, attr, placeholder)
+        return placeholder
+    module.__getattr__ = __getattr__
+    return module
+
+####
+# adsk.fusion
+####
+
+class Component:
+    """
+    A component definition. `occurrences` holds its direct children only, as in Fusion.
+    """
+    __slots__ = ('partNumber', 'description', 'entityToken', 'revisionId', 'occurrences', '_all')
+
+    def __init__(self, part_number: str, description: str, token: str) -> None:
+        self.partNumber = part_number
+        self.description = description
+        self.entityToken = token
+        self.revisionId = 'r0'
+        self.occurrences = OccurrenceList()
+        self._all = None
+
+    # Physical property queries made, which are slow in Fusion
+    mass_queries = 0
+
+    @property
+    def physicalProperties(self):
+        """
+        Computed on every access, as in Fusion. The mass is made up from the entity token.
+        """
+        Component.mass_queries += 1
+        return PhysicalProperties(0.001 * (1 + sum(map(ord, self.entityToken)) % 500))
+
+    @property
+    def allOccurrences(self):
+        """
+        Every occurrence below this component, flattened depth first. Nested occurrences are
+        separate proxy objects per instance, like Fusion's assembly-context proxies.
+        """
+        if self._all is None:
+            result = OccurrenceList()
+            def walk(comp, context, path):
+                for occ in comp.occurrences:
+                    if context is None:
+                        proxy = occ
+                    else:
+                        full_path = f'{path}+{occ.name}'
+                        proxy = Occurrence(occ.component, full_path, context, full_path)
+                    result.append(proxy)
+                    walk(occ.component, proxy, proxy.fullPathName)
+            walk(self, None, '')
+            self._all = result
+        return self._all
+
+class PhysicalProperties:
+    def __init__(self, mass: float) -> None:
+        self.mass = mass
+
+class Occurrence:
+    """
+    An instance of a component. Counts reads and writes of `isLightBulbOn`, which are round trips
+    to the host in Fusion.
+    """
+    __slots__ = ('component', 'entityToken', 'assemblyContext', 'fullPathName', '_visible')
+    reads = 0
+    writes = 0
+
+    def __init__(self, component: Component, token: str, context=None, path: str = None) -> None:
+        self.component = component
+        self.entityToken = token
+        self.assemblyContext = context
+        self.fullPathName = path if path is not None else self.name
+        self._visible = True
+
+    @property
+    def name(self) -> str:
+        return self.entityToken
+
+    @property
+    def isLightBulbOn(self) -> bool:
+        Occurrence.reads += 1
+        return self._visible
+
+    @isLightBulbOn.setter
+    def isLightBulbOn(self, value: bool) -> None:
+        Occurrence.writes += 1
+        self._visible = value
+
+    @classmethod
+    def reset_counters(cls) -> None:
+        cls.reads = 0
+        cls.writes = 0
+
+class OccurrenceList(list):
+    @property
+    def count(self) -> int:
+        return len(self)
+
+    def item(self, index: int):
+        return self[index]
+
+class Attribute:
+    def __init__(self, attributes, group: str, name: str, value: str) -> None:
+        self._attributes = attributes
+        self.groupName = group
+        self.name = name
+        self.value = value
+
+    def deleteMe(self) -> bool:
+        del self._attributes._items[(self.groupName, self.name)]
+        return True
+
+class Attributes:
+    def __init__(self) -> None:
+        self._items = {}
+
+    def add(self, group: str, name: str, value: str) -> Attribute:
+        attribute = self._items[(group, name)] = Attribute(self, group, name, value)
+        return attribute
+
+    def itemByName(self, group: str, name: str):
+        return self._items.get((group, name))
+
+    def itemsByGroup(self, group: str) -> list:
+        return [attribute for ((attr_group, _), attribute) in self._items.items() if attr_group == group]
+
+class Design(_Placeholder):
+    def __init__(self, root: Component) -> None:
+        self.rootComponent = root
+        self.activeComponent = root
+        self.attributes = Attributes()
+
+####
+# adsk.core
+####
+
+class LogLevels:
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+class LogTypes:
+    ConsoleLogType = 0
+    FileLogType = 1
+
+class UserInterface:
+    def messageBox(self, *args, **kwargs) -> int:
+        return 0
+
+class Application:
+    _instance = None
+
+    def __init__(self) -> None:
+        self.activeProduct = None
+        self.userInterface = UserInterface()
+        self.messages = []
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def log(self, message: str, *args) -> None:
+        self.messages.append(message)
+
+class ListItem:
+    def __init__(self, name: str, index: int, selected: bool = False) -> None:
+        self.name = name
+        self.index = index
+        self.isSelected = selected
+
+class ListItems(list):
+    def add(self, name: str, selected: bool, *args) -> ListItem:
+        item = ListItem(name, len(self), selected)
+        self.append(item)
+        return item
+
+class BoolValueCommandInput(_Placeholder):
+    def __init__(self, id: str, value: bool = False) -> None:
+        self.id = id
+        self.value = value
+
+class DropDownCommandInput(_Placeholder):
+    def __init__(self, id: str) -> None:
+        self.id = id
+        self.listItems = ListItems()
+
+    @property
+    def selectedItem(self) -> ListItem:
+        for item in self.listItems:
+            if item.isSelected:
+                return item
+        return None
+
+class CommandInputs(dict):
+    def itemById(self, id: str):
+        return self.get(id)
+
+def install() -> None:
+    """
+    Registers the stand-in modules as `adsk`, `adsk.core` and `adsk.fusion`.
+    """
+    core = _module('adsk.core', {name: obj for (name, obj) in globals().items()
+                                 if name in ('LogLevels', 'LogTypes', 'UserInterface', 'Application', 'ListItem',
+                                             'ListItems', 'BoolValueCommandInput', 'DropDownCommandInput',
+                                             'CommandInputs')})
+    fusion = _module('adsk.fusion', {'Component': Component, 'Occurrence': Occurrence,
+                                     'OccurrenceList': OccurrenceList, 'Design': Design})
+    core.Attributes = Attributes
+    core.Attribute = Attribute
+    adsk = _module('adsk', {'core': core, 'fusion': fusion})
+    sys.modules['adsk'] = adsk
+    sys.modules['adsk.core'] = core
+    sys.modules['adsk.fusion'] = fusion
+
+def set_design(root: Component) -> Design:
+    """
+    Makes `root` the root component of the active design.
+    """
+    design = Design(root)
+    Application.get().activeProduct = design
+    return design
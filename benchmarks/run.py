@@ -0,0 +1,395 @@
+#run.py
+#
+# Benchmarks the add-in's BOM and Frame Tools code against a simulated Fusion object model.
+# Run from anywhere with a plain Python 3 interpreter:
+#
+#   python benchmarks/run.py [--sizes 1000,10000,100000,1000000] [--catalog-rows 20000]
+#                            [--memory-rows 200000] [--batch-variants 120] [--lazy-mb 256]
+#                            [--repeat 3] [--output FILE] [--compare FILE]
+#
+# Results are written as JSON, by default to benchmarks/results/<commit>.json, so runs on
+# different commits can be compared with --compare. The Frame Tools benchmarks are skipped if
+# their modules cannot be imported.
+
+import argparse, contextlib, csv, datetime, io, importlib, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+
+import fake_adsk, synthetic
+
+BENCH_PATH = os.path.dirname(os.path.abspath(__file__))
+ADDIN_PATH = os.path.dirname(BENCH_PATH)
+PACKAGE = os.path.basename(ADDIN_PATH)
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+def addin_module(name: str):
+    """
+    Imports a module of the add-in by its dotted path, e.g. 'commands.bomDialog.bom'.
+    """
+    if os.path.dirname(ADDIN_PATH) not in sys.path:
+        sys.path.insert(0, os.path.dirname(ADDIN_PATH))
+    return importlib.import_module(f'{PACKAGE}.{name}')
+
+def measure(fn, repeat: int) -> float:
+    """
+    Returns the best wall time of `repeat` calls to `fn`, in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+class Results:
+    def __init__(self) -> None:
+        self.items = []
+
+    def add(self, name: str, size: int, seconds: float, **extra) -> None:
+        item = {'name': name, 'size': size, 'seconds': seconds}
+        item.update(extra)
+        self.items.append(item)
+        detail = ''.join(f'  {key}={value}' for (key, value) in extra.items())
+        print(f'{name:<40} {size:>9} {seconds * 1000:>10.2f} ms{detail}')
+
+def bench_model(results: Results, size: int, repeat: int, display) -> list:
+    """
+    Times model traversal and Frame Tools views on an assembly of `size` occurrences.
+
+    Returns: the part records of the assembly, for the catalog benchmarks
+    """
+    bom = addin_module('commands.bomDialog.bom')
+    root = synthetic.build_assembly(size)
+    design = fake_adsk.set_design(root)
+    occurrences = root.allOccurrences
+    count = len(occurrences)
+    results.add('bom.extract_model_data', count, measure(lambda: bom.extract_model_data(occurrences), repeat))
+    model_parts = bom.rollup_model_data(root)
+    results.add('bom.rollup_model_data', count, measure(lambda: bom.rollup_model_data(root), repeat),
+                unique_parts=len(model_parts))
+
+    if display is not None:
+        views = addin_module('commands.frameHelper.views').load_views()
+        by_name = {view.name: view for view in views}
+        sequence = ['Show All', 'Frame View', 'Tee Nut View', 'Frame View', 'Show All']
+        display.show_view(by_name['Show All'])
+        for name in sequence[1:]:
+            fake_adsk.Occurrence.reset_counters()
+            start = time.perf_counter()
+            skipped = display.show_view(by_name[name])
+            elapsed = time.perf_counter() - start
+            results.add(f'display.show_view({name})', count, elapsed,
+                        writes=fake_adsk.Occurrence.writes, skipped=skipped)
+
+        # Save the current (Show All) state, change the view, then restore the snapshot twice: the
+        # first restore writes what the view changed, the second nothing
+        snapshots = addin_module('commands.frameHelper.snapshots')
+        start = time.perf_counter()
+        snapshot = snapshots.capture('bench', occurrences)
+        snapshots.save(design, snapshot)
+        results.add('snapshots.capture+save', count, time.perf_counter() - start,
+                    stored_kb=len(design.attributes.itemByName(snapshots.ATTRIBUTE_GROUP, 'bench').value) // 1024)
+        display.show_view(by_name['Frame View'])
+        for label in ('changed', 'unchanged'):
+            fake_adsk.Occurrence.reset_counters()
+            start = time.perf_counter()
+            (written, skipped, _) = snapshots.restore(snapshots.load(design, 'bench'), occurrences)
+            results.add(f'snapshots.load+restore({label})', count, time.perf_counter() - start,
+                        writes=written, skipped=skipped)
+    return model_parts
+
+def bench_catalog(results: Results, rows: int, model_parts: list, repeat: int, workdir: str) -> None:
+    """
+    Times source parsing, caching, merging and the exporters on a catalog of `rows` rows.
+    """
+    config = addin_module('config')
+    data_parser = addin_module('commands.bomDialog.data_parser')
+    catalog_cache = addin_module('commands.bomDialog.catalog_cache')
+    bom = addin_module('commands.bomDialog.bom')
+    markdown_exporter = addin_module('commands.bomDialog.markdown_exporter')
+    json_exporter = addin_module('commands.bomDialog.json_exporter')
+
+    config.CACHE_PATH = os.path.join(workdir, 'cache')
+    source = os.path.join(workdir, 'source.csv')
+    synthetic.write_catalog(source, rows, sorted({part['ID'] for part in model_parts}))
+    total = rows + len(model_parts)
+
+    results.add('data_parser.import_source_data', total, measure(lambda: data_parser.import_source_data(source), repeat))
+
+    def cold():
+        catalog_cache.clear()
+        for name in os.listdir(config.CACHE_PATH) if os.path.isdir(config.CACHE_PATH) else ():
+            os.remove(os.path.join(config.CACHE_PATH, name))
+        catalog_cache.load_source_data(source)
+    def from_disk():
+        catalog_cache.clear()
+        catalog_cache.load_source_data(source)
+    results.add('catalog_cache.load_source_data (cold)', total, measure(cold, repeat))
+    results.add('catalog_cache.load_source_data (disk)', total, measure(from_disk, repeat))
+    results.add('catalog_cache.load_source_data (memory)', total,
+                measure(lambda: catalog_cache.load_source_data(source), repeat))
+
+    catalog = catalog_cache.load_source_data(source)
+    def merge():
+        (parts, problems) = bom.merge_source_data(model_parts, catalog)
+        return parts
+    results.add('bom.merge_source_data', total, measure(merge, repeat), model_parts=len(model_parts),
+                defaults=len(catalog.defaults))
+
+    parts = merge()
+    csv_path = os.path.join(workdir, 'bom.csv')
+    md_path = os.path.join(workdir, 'bom.md')
+    results.add('data_parser.export_csv_bom', len(parts),
+                measure(lambda: data_parser.export_csv_bom(csv_path, parts), repeat))
+    results.add('markdown_exporter.export_markdown_bom', len(parts),
+                measure(lambda: markdown_exporter.export_markdown_bom(md_path, parts, section_key='Type', include_id=False), repeat))
+    json_path = os.path.join(workdir, 'bom.json')
+    results.add('json_exporter.export_json_bom', len(parts),
+                measure(lambda: json_exporter.export_json_bom(json_path, parts), repeat))
+
+    # The CSV writer against the DictWriter export it replaced, on every catalog row. Both write the
+    # same rows; the dicts are built up front, since the old export wrote the caller's dicts.
+    rows = {part_id: catalog[part_id].replace(Qty=1) for part_id in catalog}
+    row_dicts = {part_id: dict(row) for (part_id, row) in rows.items()}
+    results.add('csv export (DictWriter, before)', len(rows),
+                measure(lambda: export_csv_as_dicts(csv_path, row_dicts), repeat))
+    results.add('data_parser.write_csv_bom', len(rows),
+                measure(lambda: data_parser.write_csv_bom(csv_path, rows.items()), repeat))
+
+def export_csv_as_dicts(filepath: str, data: dict) -> None:
+    """
+    Writes a bill of materials with `csv.DictWriter`, as `data_parser.export_csv_bom()` did before
+    the streaming writer. Kept as the baseline for the CSV export benchmark.
+    """
+    data_parser = addin_module('commands.bomDialog.data_parser')
+    with open(filepath, 'w', newline='') as datafile:
+        writer = csv.DictWriter(datafile, data_parser.EXPORT_FIELDS, dialect=csv.excel)
+        writer.writeheader()
+        for part_num in data.keys():
+            if data[part_num]['Qty'] == 0:
+                continue
+            outdata = data[part_num]
+            outdata['ID'] = part_num
+            writer.writerow(outdata)
+
+def parse_as_dicts(filepath: str) -> dict:
+    """
+    Parses a source file into one dict per row, the layout `data_parser` used before `PartRecord`.
+    Kept as the baseline for the memory benchmark.
+    """
+    data_parser = addin_module('commands.bomDialog.data_parser')
+    result = {}
+    with open(filepath, 'r', newline='') as datafile:
+        for row in csv.DictReader(datafile, fieldnames=data_parser.SOURCE_FIELDS, dialect='excel'):
+            part = {field: row[field] for field in data_parser.PART_FIELDS if field != 'Qty'}
+            part['Qty'] = int(row['DefaultValue']) if row['DefaultValue'].isnumeric() else 0
+            result[row['ID']] = part
+    return result
+
+def retained_bytes(fn) -> tuple:
+    """
+    Calls `fn` and measures the memory still allocated by its result.
+
+    Returns: a `tuple` of the result and the retained bytes
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (result, after - before)
+
+def bench_mass(results: Results, model_parts: list, workdir: str) -> None:
+    """
+    Times part masses for the BOM's mass columns: querying every component, then from the cache in
+    memory and on disk. `queries` counts physical property queries, which are slow in Fusion.
+    """
+    config = addin_module('config')
+    mass_cache = addin_module('commands.bomDialog.mass_cache')
+    config.CACHE_PATH = os.path.join(workdir, 'cache')
+    mass_cache.clear()
+    for (label, disk) in (('cold', True), ('memory', None), ('disk', False)):
+        if disk is not None:
+            mass_cache.clear(disk)
+        fake_adsk.Component.mass_queries = 0
+        start = time.perf_counter()
+        masses = mass_cache.part_masses(model_parts)
+        results.add(f'mass_cache.part_masses ({label})', len(model_parts), time.perf_counter() - start,
+                    parts=len(masses), queries=fake_adsk.Component.mass_queries)
+
+def bench_batch(results: Results, variants: int, workdir: str) -> None:
+    """
+    Times `batch.main` on `variants` synthetic snapshots with its process pool, against generating
+    the same BOMs one after another in this process.
+    """
+    config = addin_module('config')
+    bom = addin_module('commands.bomDialog.bom')
+    snapshot = addin_module('commands.bomDialog.snapshot')
+    batch = addin_module('commands.bomDialog.batch')
+    catalog_cache = addin_module('commands.bomDialog.catalog_cache')
+
+    config.CACHE_PATH = os.path.join(workdir, 'cache')
+    snapshot_dir = os.path.join(workdir, 'variants')
+    os.makedirs(snapshot_dir, exist_ok=True)
+    paths = []
+    ids = set()
+    for seed in range(variants):
+        model_parts = bom.rollup_model_data(synthetic.build_assembly(2000, seed))
+        ids.update(part['ID'] for part in model_parts)
+        path = os.path.join(snapshot_dir, f'variant{seed:04d}.c3snap')
+        snapshot.save_snapshot(path, model_parts)
+        paths.append(path)
+    source = os.path.join(workdir, 'batch.csv')
+    synthetic.write_catalog(source, 5000, sorted(ids))
+
+    def clear_cache():
+        catalog_cache.clear()
+        for name in os.listdir(config.CACHE_PATH) if os.path.isdir(config.CACHE_PATH) else ():
+            os.remove(os.path.join(config.CACHE_PATH, name))
+
+    out_dir = os.path.join(workdir, 'batch-serial')
+    os.makedirs(out_dir, exist_ok=True)
+    clear_cache()
+    start = time.perf_counter()
+    results_serial = [batch.run_variant(path, [source], out_dir) for path in paths]
+    elapsed = time.perf_counter() - start
+    results.add('batch serial', variants, elapsed, variants_per_second=round(variants / elapsed, 1),
+                failed=sum(result['status'] != 'done' for result in results_serial))
+
+    clear_cache()
+    argv = ['--source', source, '--out-dir', os.path.join(workdir, 'batch-pool')] + paths
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = batch.main(argv)
+    elapsed = time.perf_counter() - start
+    results.add(f'batch.main (pool of {os.cpu_count()})', variants, elapsed,
+                variants_per_second=round(variants / elapsed, 1), exit_status=status)
+
+def bench_memory(results: Results, rows: int, workdir: str) -> None:
+    """
+    Measures the memory per row of a parsed catalog of `rows` rows, as part records and as the
+    previous dict-per-row layout.
+    """
+    data_parser = addin_module('commands.bomDialog.data_parser')
+    source = os.path.join(workdir, 'memory.csv')
+    synthetic.write_catalog(source, rows)
+    for (name, parse) in (('dicts', parse_as_dicts), ('records', data_parser.import_source_data)):
+        start = time.perf_counter()
+        (parts, size) = retained_bytes(lambda: parse(source))
+        elapsed = time.perf_counter() - start
+        results.add(f'catalog memory ({name})', len(parts), elapsed,
+                    bytes=size, bytes_per_row=round(size / len(parts)))
+        del parts
+
+def bench_lazy(results: Results, megabytes: int, model_parts: list, workdir: str) -> None:
+    """
+    Compares parsing a source file of about `megabytes` MB in full with opening it as a lazy
+    catalog and merging. Each case runs once; the file is too large to repeat them cheaply.
+    """
+    config = addin_module('config')
+    data_parser = addin_module('commands.bomDialog.data_parser')
+    lazy_catalog = addin_module('commands.bomDialog.lazy_catalog')
+    bom = addin_module('commands.bomDialog.bom')
+
+    config.CACHE_PATH = os.path.join(workdir, 'cache')
+    source = os.path.join(workdir, 'huge.csv')
+    # Synthetic rows average about 110 bytes
+    synthetic.write_catalog(source, megabytes * 1024 * 1024 // 110, sorted({part['ID'] for part in model_parts}))
+    size = os.path.getsize(source)
+    label = f'{size / (1024 * 1024):.0f} MB'
+
+    start = time.perf_counter()
+    parts = data_parser.import_source_data(source)
+    bom.merge_source_data(model_parts, parts)
+    results.add(f'full parse + merge ({label})', len(parts), time.perf_counter() - start)
+    rows = len(parts)
+    del parts
+
+    start = time.perf_counter()
+    catalog = lazy_catalog.open_catalog(source)
+    results.add(f'lazy_catalog index build ({label})', rows, time.perf_counter() - start)
+    start = time.perf_counter()
+    catalog = lazy_catalog.open_catalog(source)
+    opened = time.perf_counter()
+    bom.merge_source_data(model_parts, catalog)
+    end = time.perf_counter()
+    catalog.close()
+    results.add(f'lazy_catalog open, index on disk ({label})', rows, opened - start)
+    results.add(f'lazy_catalog merge ({label})', rows, end - opened,
+                model_parts=len(model_parts), defaults=len(catalog.defaults))
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ADDIN_PATH,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def compare(current: list, previous_path: str) -> None:
+    """
+    Prints the change in time for every benchmark present in both runs.
+    """
+    with open(previous_path, 'r') as infile:
+        previous = json.load(infile)
+    old = {(item['name'], item['size']): item['seconds'] for item in previous['results']}
+    print(f'\nCompared with {previous.get("commit", previous_path)}:')
+    for item in current:
+        before = old.get((item['name'], item['size']))
+        if before:
+            print(f'{item["name"]:<40} {item["size"]:>9} {item["seconds"] / before:>8.2f}x')
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the Clock 3 add-in against a simulated Fusion model.')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma separated assembly sizes, in occurrences')
+    parser.add_argument('--catalog-rows', type=int, default=20000, help='generic rows in the source catalog')
+    parser.add_argument('--memory-rows', type=int, default=200000, help='rows in the catalog for the memory benchmark')
+    parser.add_argument('--batch-variants', type=int, default=120, help='snapshots for the batch benchmark; 0 skips it')
+    parser.add_argument('--lazy-mb', type=int, default=256, help='size of the catalog for the lazy catalog benchmark; 0 skips it')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark; the best is kept')
+    parser.add_argument('--output', default=None, help='JSON results file')
+    parser.add_argument('--compare', default=None, help='earlier JSON results file to compare against')
+    args = parser.parse_args(argv)
+
+    fake_adsk.install()
+    try:
+        display = addin_module('commands.frameHelper.display')
+    except ImportError as e:
+        print(f'Skipping Frame Tools benchmarks: {e}')
+        display = None
+
+    results = Results()
+    model_parts = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(size) for size in args.sizes.split(',')):
+            parts = bench_model(results, size, args.repeat, display)
+            if not model_parts or size <= 10000:
+                model_parts = parts
+        bench_catalog(results, args.catalog_rows, model_parts, args.repeat, workdir)
+        bench_mass(results, model_parts, workdir)
+        if args.batch_variants:
+            bench_batch(results, args.batch_variants, workdir)
+        bench_memory(results, args.memory_rows, workdir)
+        if args.lazy_mb:
+            bench_lazy(results, args.lazy_mb, model_parts, workdir)
+
+    commit = git_commit()
+    output = args.output or os.path.join(BENCH_PATH, 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as outfile:
+        json.dump({
+            'commit': commit,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results.items
+        }, outfile, indent=1)
+    print(f'\nResults written to {output}')
+    if args.compare:
+        compare(results.items, args.compare)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#synthetic.py
+#
+# Synthetic assemblies and source catalogs for the benchmarks. Assemblies reuse a pool of
+# subassemblies (brackets, corners, carriages) many times, so the number of unique components
+# grows much more slowly than the number of occurrences, as in the Clock 3 master model.
+
+import csv, random
+
+import fake_adsk
+
+# Prefixes the Frame Tools views care about, mixed in with generic part numbers
+VIEW_PREFIXES = ('PN70', 'PN710', 'PN72', 'PN73', 'PN74', 'PN75', 'PN575')
+TYPES = ('Frame', 'Hardware', 'Electronics', 'Printed Parts', 'Materials', 'Supplies')
+UOMS = ('ea', 'cm', 'g', 'ml')
+SUPPLIERS = ('McMaster-Carr', 'Misumi', 'Amazon', 'DigiKey', '')
+
+def part_numbers(count: int, seed: int = 0) -> list:
+    """
+    Returns `count` unique part numbers, a mix of view prefixes and generic ones.
+    """
+    rng = random.Random(seed)
+    result = []
+    for index in range(count):
+        if rng.random() < 0.3:
+            result.append(f'{rng.choice(VIEW_PREFIXES)}-{index:05d}')
+        else:
+            result.append(f'PN{100 + index % 500:03d}-{index:05d}')
+    return result
+
+def build_assembly(occurrences: int, seed: int = 0) -> fake_adsk.Component:
+    """
+    Builds a root component with roughly `occurrences` occurrences in total once flattened.
+    Unique parts scale with occurrences ** 0.6, e.g. ~250 for 10k and ~4000 for 1M, and about one
+    in ten unique components is a subassembly.
+    """
+    rng = random.Random(seed)
+    unique = max(20, int(occurrences ** 0.6))
+    tokens = iter(range(1 << 62))
+    def component(part_number: str, description: str) -> fake_adsk.Component:
+        return fake_adsk.Component(part_number, description, f'comp{next(tokens)}')
+    def place(parent: fake_adsk.Component, child: fake_adsk.Component) -> None:
+        parent.occurrences.append(fake_adsk.Occurrence(child, f'occ{next(tokens)}'))
+
+    parts = [component(number, f'Part {number}') for number in part_numbers(unique, seed)]
+    # Sizes (flattened occurrence counts) are tracked so the root can be filled to the target
+    sizes = {}
+    subassemblies = []
+    for index in range(max(2, unique // 10)):
+        sub = component('' if index % 3 else f'SA{index:04d}', f'Subassembly {index}')
+        size = 0
+        # Some subassemblies nest an earlier one, e.g. a corner built from two brackets
+        if subassemblies and rng.random() < 0.4:
+            nested = rng.choice(subassemblies)
+            for _ in range(rng.randint(1, 2)):
+                place(sub, nested)
+                size += 1 + sizes[nested.entityToken]
+        for _ in range(rng.randint(4, 16)):
+            place(sub, rng.choice(parts))
+            size += 1
+        sizes[sub.entityToken] = size
+        subassemblies.append(sub)
+
+    root = component('', 'Root')
+    total = 0
+    while total < occurrences:
+        if rng.random() < 0.7:
+            sub = rng.choice(subassemblies)
+            place(root, sub)
+            total += 1 + sizes[sub.entityToken]
+        else:
+            place(root, rng.choice(parts))
+            total += 1
+    return root
+
+def write_catalog(filepath: str, rows: int, extra_ids: list = (), seed: int = 0) -> None:
+    """
+    Writes a source .csv in the add-in's import format with `rows` generic entries plus one entry
+    for each ID in `extra_ids`.
+    """
+    rng = random.Random(seed)
+    ids = list(extra_ids)
+    seen = set(ids)
+    index = 0
+    while len(ids) < rows + len(extra_ids):
+        prefix = rng.choice(('PN', 'PN', 'MN', 'UN'))
+        part_id = f'{prefix}{index:06d}'
+        index += 1
+        if part_id not in seen:
+            ids.append(part_id)
+    with open(filepath, 'w', newline='') as datafile:
+        writer = csv.writer(datafile, dialect='excel')
+        for part_id in ids:
+            default = rng.choice(('', '', '', '1', '4')) if not part_id.startswith('PN') else ''
+            writer.writerow((part_id,
+                             rng.choice(TYPES),
+                             f'Description of {part_id}, "quoted" text',
+                             rng.choice(UOMS),
+                             default,
+                             rng.choice(SUPPLIERS),
+                             rng.choice(('', f'https://example.com/{part_id}')),
+                             'Mfgr',
+                             f'M-{part_id}',
+                             rng.choice(('', '', 'See notes'))))
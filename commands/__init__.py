@@ -1,18 +1,78 @@
-from .bomDialog import entry as bomDialog
-from .frameHelper import entry as frameHelper
+import importlib, logging, os, time
 
-# List of all commands
-commands = [
-    bomDialog,
-    frameHelper
-]
+from .. import config
 
-# Iterate over entry.py in each command's folder and call `start()`
+log = logging.getLogger(__name__)
+
+class Command:
+    """
+    What is needed to add a command's button: its ID, name, description, icon folder and
+    position. The command's entry module is only imported the first time the button is clicked,
+    so add-in startup does not pay for commands a session never uses.
+    """
+    def __init__(self, folder: str, cmd_id: str, name: str, description: str, beside_id: str = '') -> None:
+        self.folder = folder
+        self.id = cmd_id
+        self.name = name
+        self.description = description
+        self.icon_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), folder, 'resources')
+        self.beside_id = beside_id
+        self.module = None
+
+    def load(self):
+        """
+        Imports the command's entry module and calls its `start()`, unless already done.
+
+        Returns: the entry module
+        """
+        if self.module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(f'.{self.folder}.entry', __name__)
+            module.start()
+            self.module = module
+            log.info('Loaded %s in %.1f ms', self.name, (time.perf_counter() - start) * 1000)
+        return self.module
+
+    def command_created(self, args) -> None:
+        self.load().command_created(args)
+
+# Commands in toolbar order. Entry modules read their metadata from here, by folder name. They are
+# imported on first use rather than in `start()`, which also lets the package be imported without
+# Fusion, e.g. by `bomDialog/batch.py`.
+COMMANDS = {command.folder: command for command in [
+    Command('bomDialog', f'{config.ADDIN_PREFIX}_bomDialog', 'Generate BOM',
+            'Bill of Materials generator for the Clock 3 project'),
+    Command('frameHelper', f'{config.ADDIN_PREFIX}_frameHelperDialog', 'Frame Tools',
+            'Displays the frame and roll in tee nuts to help documentation',
+            beside_id=f'{config.ADDIN_PREFIX}_bomDialog')
+]}
+
+# Add a button for each command
 def start():
-    for command in commands:
-        command.start()
+    from ..lib import fusion360utils as futil
+    ui = futil.app.userInterface
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+    for command in COMMANDS.values():
+        cmd_def = ui.commandDefinitions.addButtonDefinition(command.id, command.name, command.description,
+                                                            command.icon_folder)
+        futil.add_handler(cmd_def.commandCreated, command.command_created)
+        control = panel.controls.addCommand(cmd_def, command.beside_id, False)
+        control.isPromoted = True
 
-# Iterate over entry.py in each command's folder and call `stop()`
+# Call `stop()` in each loaded entry module and remove every button
 def stop():
-    for command in commands:
-        command.stop()
\ No newline at end of file
+    from ..lib import fusion360utils as futil
+    ui = futil.app.userInterface
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+    for command in COMMANDS.values():
+        if command.module is not None:
+            command.module.stop()
+            command.module = None
+        command_control = panel.controls.itemById(command.id) if panel else None
+        if command_control:
+            command_control.deleteMe()
+        command_definition = ui.commandDefinitions.itemById(command.id)
+        if command_definition:
+            command_definition.deleteMe()
@@ -0,0 +1,88 @@
+#atomic_write.py
+#
+# Atomic, write-if-changed output for the exporters. A file is rendered to a temporary file next to
+# its destination and only moved over the destination if the content differs, so tools watching the
+# output (e.g. version control or a docs build) only see real changes, and never a half-written file.
+# The caches write their pickles the same way, with `dump_pickle()`.
+
+import hashlib, os, pickle, uuid
+from typing import Callable
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def write_if_changed(dest_path: str, write: Callable[[str], None]) -> bool:
+    """
+    Calls `write` with a temporary path in the same folder as `dest_path`. If the result differs from
+    the current `dest_path`, it replaces it in one step; otherwise it is discarded and `dest_path`
+    is left untouched, including its modification time. The temporary file name ends in the
+    destination's name, so writers that check the extension still work.
+
+    Returns: `True` if `dest_path` was created or replaced, `False` if it was unchanged
+    """
+    temp_path = temp_path_for(dest_path)
+    try:
+        write(temp_path)
+        if same_content(temp_path, dest_path):
+            os.remove(temp_path)
+            return False
+        os.replace(temp_path, dest_path)
+        return True
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def temp_path_for(dest_path: str) -> str:
+    """
+    Returns a temporary path next to `dest_path` that no other thread or process will use, ending
+    in the destination's name.
+    """
+    (folder, name) = os.path.split(os.path.abspath(dest_path))
+    return os.path.join(folder, f'.tmp-{uuid.uuid4().hex[:12]}-{name}')
+
+def dump_pickle(dest_path: str, obj) -> bool:
+    """
+    Pickles `obj` to `dest_path`, creating its folder if needed. The file is written under a
+    temporary name and moved into place, so several threads or processes, e.g. `batch.py` workers,
+    can write the same cache file at once and readers never see a partial one. Failures are
+    ignored, as the callers' files are only caches.
+
+    Returns: `True` if the file was written
+    """
+    temp_path = temp_path_for(dest_path)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        with open(temp_path, 'wb') as datafile:
+            pickle.dump(obj, datafile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, dest_path)
+        return True
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+
+def same_content(filepath: str, other_path: str) -> bool:
+    """
+    Returns `True` if both files exist and have the same content. Sizes are compared first, so
+    files are only hashed when they might match.
+    """
+    try:
+        if os.path.getsize(filepath) != os.path.getsize(other_path):
+            return False
+        return file_digest(filepath) == file_digest(other_path)
+    except OSError:
+        return False
+
+def file_digest(filepath: str) -> bytes:
+    """
+    Returns the SHA-256 digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as datafile:
+        for chunk in iter(lambda: datafile.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.digest()
@@ -0,0 +1,121 @@
+#batch.py
+#
+# Headless BOM generation from occurrence snapshots, e.g. for CI. Run from the folder that contains
+# the add-in so its relative imports resolve:
+#
+#   python -m Clock3Scripts.commands.bomDialog.batch --source overrides.csv --source source.csv \
+#       --format md --format json --out-dir bom variant_a.c3snap variant_b.c3snap
+#
+# Repeat --source to layer catalogs; parts in earlier files override later ones. Repeat --format to
+# write several formats from one merge.
+#
+# Each snapshot is processed in its own worker process and written to OUT_DIR/<snapshot name>.<ext>.
+# This module does not import adsk.
+
+import argparse, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import pipeline, snapshot
+
+FORMATS = {
+    'csv': (pipeline.FORMAT_CSV, '.csv'),
+    'md': (pipeline.FORMAT_MARKDOWN, '.md'),
+    'json': (pipeline.FORMAT_JSON, '.json'),
+}
+
+def run_variant(snapshot_path: str,
+                source_paths: list,
+                out_dir: str,
+                export_formats: list = ('csv',),
+                include_materials: bool = True,
+                include_supplies: bool = True) -> dict:
+    """
+    Generates one BOM from a snapshot, in every format in `export_formats`. Runs in a worker
+    process.
+
+    Returns: the result `dict` from `pipeline.ExportJob.run()`, plus the `snapshot` path
+    """
+    name = os.path.splitext(os.path.basename(snapshot_path))[0]
+    exports = [(FORMATS[export_format][0], os.path.join(out_dir, name + FORMATS[export_format][1]))
+               for export_format in export_formats]
+    try:
+        data = snapshot.load_snapshot(snapshot_path)
+        job = pipeline.ExportJob(data['parts'],
+                                 source_paths,
+                                 exports,
+                                 include_materials,
+                                 include_supplies,
+                                 data['structure'])
+        result = job.run()
+    except Exception as e:
+        result = {'status': pipeline.STATUS_ERROR, 'message': f'{type(e).__name__}: {e}'}
+    result['snapshot'] = snapshot_path
+    return result
+
+def run_batch(snapshot_paths: list,
+              source_paths: list,
+              out_dir: str,
+              export_formats: list = ('csv',),
+              include_materials: bool = True,
+              include_supplies: bool = True,
+              jobs: int = None) -> list:
+    """
+    Generates a BOM for every snapshot, spreading them over a process pool.
+
+    source_paths: Source files in lookup order.
+    jobs: Number of worker processes. Defaults to the number of CPUs.
+
+    Returns: a `list` of result `dict`s, in the order of `snapshot_paths`
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    count = len(snapshot_paths)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run_variant,
+                                 snapshot_paths,
+                                 [source_paths] * count,
+                                 [out_dir] * count,
+                                 [export_formats] * count,
+                                 [include_materials] * count,
+                                 [include_supplies] * count))
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Generate Clock 3 bills of materials from occurrence snapshots.')
+    parser.add_argument('snapshots', nargs='+', help='occurrence snapshot files exported from the BOM dialog')
+    parser.add_argument('--source', required=True, action='append',
+                        help='source catalog (.csv); repeat to layer catalogs, earlier ones take precedence')
+    parser.add_argument('--format', choices=sorted(FORMATS), action='append',
+                        help='output format; repeat for several (default: csv)')
+    parser.add_argument('--out-dir', default='.', help='folder for the generated files')
+    parser.add_argument('--no-materials', action='store_true', help='leave out fabrication materials')
+    parser.add_argument('--no-supplies', action='store_true', help='leave out miscellaneous supplies')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_batch(args.snapshots,
+                        [os.path.abspath(source) for source in args.source],
+                        args.out_dir,
+                        args.format or ['csv'],
+                        not args.no_materials,
+                        not args.no_supplies,
+                        args.jobs)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for result in results:
+        status = result['status']
+        if status == pipeline.STATUS_DONE:
+            written = [path if updated else f'{path} (unchanged)'
+                       for (path, updated) in zip(result['written'], result['updated'])]
+            print(f'{result["snapshot"]}: wrote {", ".join(written)}')
+            continue
+        failed += 1
+        if status == pipeline.STATUS_PROBLEMS:
+            print(f'{result["snapshot"]}: parts not found in {", ".join(result["searched"])}: {", ".join(result["problems"])}', file=sys.stderr)
+        else:
+            print(f'{result["snapshot"]}: failed: {result.get("message", status)}', file=sys.stderr)
+    print(f'{len(results) - failed}/{len(results)} variants in {elapsed:.2f}s')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
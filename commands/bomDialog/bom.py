@@ -1,7 +1,9 @@
 #bom.py
 
-import adsk.core, adsk.fusion
-from ...lib import fusion360utils as futil
+# Nothing here touches adsk directly, so the module can be used headless (see `batch.py`).
+from collections import OrderedDict
+from typing import Mapping
+
 from ... import config
 
 class MergeBomException(Exception):
@@ -12,6 +14,13 @@ class MergeBomException(Exception):
         super().__init__(*args)
         self.part_id = part_id
 
+def component_key(comp) -> str:
+    """
+    Returns a stable identity for a component, used to key aggregated part data. Proxies for the
+    same component compare equal but are distinct objects, so the entity token is used instead.
+    """
+    return comp.entityToken
+
 def extract_model_data(occurrences) -> list:
     """
     Iterates over an object, finding any parts with a PN prefix. For each occurrence, if the item is new, it creates a list entry. Otherwise, it increments the list count.
@@ -20,25 +29,164 @@ def extract_model_data(occurrences) -> list:
 
     Returns: a `list` of `dict`s
     """
-    ret = []
+    # Keyed on component identity; dicts keep insertion order, so records come out in the
+    # order each component was first seen.
+    found = {}
     for occ in occurrences:
         comp = occ.component
-        if not comp.partNumber.startswith(config.PART_PREFIX):
+        part_number = comp.partNumber
+        if not part_number.startswith(config.PART_PREFIX):
             continue
-        index = 0
-        for item in ret:
-            if item['component'] == comp:
-                item['count'] += 1
-                break
-            index += 1
-
-        if index == len(ret):
-            ret.append({
+        key = component_key(comp)
+        item = found.get(key)
+        if item is None:
+            found[key] = {
                 'component': comp,
                 'name': comp.description,
                 'count': 1,
-                'ID': comp.partNumber
-            })
+                'ID': part_number
+            }
+        else:
+            item['count'] += 1
+    return list(found.values())
+
+def rollup_model_data(root_component) -> list:
+    """
+    Counts parts below `root_component` without flattening `allOccurrences`. The design is treated
+    as a graph of components: each unique component's part counts are computed once and scaled by
+    how many times it is used, so the cost follows unique components rather than instances.
+    Totals match `extract_model_data(root_component.allOccurrences)`.
+
+    root_component: The `Component` to count from, typically the root or active component.
+
+    Returns: a `list` of `dict`s, as `extract_model_data()`
+    """
+    components = {}
+    counts = _subtree_counts(root_component, {}, components)
+    return _part_records(counts, components)
+
+def collapse_selection(occurrences) -> list:
+    """
+    Drops every occurrence that is nested inside another one in `occurrences`, so selecting a
+    subassembly and one of its children counts the child once. Nesting is found from each
+    occurrence's `fullPathName` ('Sub:1+Child:1'): an occurrence is dropped if any of its path
+    prefixes was selected. Selecting the same occurrence twice also keeps only one.
+
+    occurrences: Any iterable of `Occurrence`s, typically the current selection.
+
+    Returns: a `list` of the outermost selected occurrences, in selection order
+    """
+    selected = {}
+    for occ in occurrences:
+        selected.setdefault(occ.fullPathName, occ)
+    roots = []
+    for (path, occ) in selected.items():
+        cut = path.rfind('+')
+        while cut >= 0 and path[:cut] not in selected:
+            cut = path.rfind('+', 0, cut)
+        if cut < 0:
+            roots.append(occ)
+    return roots
+
+def selection_model_data(occurrences) -> list:
+    """
+    Counts the parts in a selection of occurrences: each selected occurrence plus everything below
+    it, with nested selections collapsed by `collapse_selection()`. Subtree counts are memoized per
+    component, as in `rollup_model_data()`, so selecting many instances of the same subassembly
+    costs one traversal of it.
+
+    occurrences: Any iterable of `Occurrence`s, typically the current selection.
+
+    Returns: a `list` of `dict`s, as `extract_model_data()`
+    """
+    memo = {}
+    components = {}
+    counts = {}
+    for occ in collapse_selection(occurrences):
+        comp = occ.component
+        key = component_key(comp)
+        components[key] = comp
+        counts[key] = counts.get(key, 0) + 1
+        for (sub_key, sub_count) in _subtree_counts(comp, memo, components).items():
+            counts[sub_key] = counts.get(sub_key, 0) + sub_count
+    return _part_records(counts, components)
+
+def model_structure(root_component) -> tuple:
+    """
+    Like `rollup_model_data()`, but keeps every component (not just parts) and how they nest.
+
+    root_component: The `Component` to count from, typically the root or active component.
+
+    Returns: a `tuple` of (records, edges). Records are `dict`s as `extract_model_data()` without
+    the `component` key. Edges are (parent index, child index, uses) tuples indexing into the
+    records, where a parent index of -1 is `root_component`.
+    """
+    components = {}
+    edges = {}
+    counts = _subtree_counts(root_component, {}, components, edges)
+    records = []
+    index = {}
+    for (key, count) in counts.items():
+        comp = components[key]
+        index[key] = len(records)
+        records.append({'name': comp.description, 'count': count, 'ID': comp.partNumber})
+    root_key = component_key(root_component)
+    structure = []
+    for (parent_key, children) in edges.items():
+        parent_index = -1 if parent_key == root_key else index[parent_key]
+        for (child_key, uses) in children.items():
+            structure.append((parent_index, index[child_key], uses))
+    return (records, structure)
+
+def _subtree_counts(comp, memo: dict, components: dict, edges: dict = None) -> dict:
+    """
+    Returns a `dict` of component key to instance count for everything below `comp`. Results are
+    stored in `memo`, and every component seen is recorded in `components` by key. A memo hit adds
+    nothing to `components`, so share a memo only together with the `components` it was filled with. If given,
+    `edges` receives each component's direct children and their use counts.
+    """
+    key = component_key(comp)
+    counts = memo.get(key)
+    if counts is not None:
+        return counts
+
+    # Count direct children first so each child's subtree is merged once, scaled by its uses
+    direct = {}
+    for occ in comp.occurrences:
+        child = occ.component
+        child_key = component_key(child)
+        if child_key in direct:
+            direct[child_key][1] += 1
+        else:
+            direct[child_key] = [child, 1]
+
+    counts = {}
+    for (child_key, (child, uses)) in direct.items():
+        components[child_key] = child
+        counts[child_key] = counts.get(child_key, 0) + uses
+        for (sub_key, sub_count) in _subtree_counts(child, memo, components, edges).items():
+            counts[sub_key] = counts.get(sub_key, 0) + sub_count * uses
+    if edges is not None:
+        edges[key] = {child_key: uses for (child_key, (_, uses)) in direct.items()}
+    memo[key] = counts
+    return counts
+
+def _part_records(counts: dict, components: dict) -> list:
+    """
+    Converts per-component counts into the records returned by `extract_model_data()`.
+    """
+    ret = []
+    for (key, count) in counts.items():
+        comp = components[key]
+        part_number = comp.partNumber
+        if not part_number.startswith(config.PART_PREFIX):
+            continue
+        ret.append({
+            'component': comp,
+            'name': comp.description,
+            'count': count,
+            'ID': part_number
+        })
     return ret
 
 def pretty_format_bom(parts: dict) -> str:
@@ -53,23 +201,41 @@ def pretty_format_bom(parts: dict) -> str:
          ret += raw.format(id, item['Type'], str(item['Value']), item['UOM'], item['Description'])
      return ret
 
-def merge_source_data(bom: dict, 
-                      parts : dict,
-                      include_materials: bool = True,
-                      include_supplies: bool = True):
+def default_ids(parts: Mapping) -> list:
     """
-    Takes in part data from a model (`bom`) and source information (`parts`) and filters the data
-    for empty entries. Flags modify if default values for materials and supplies are included.
+    Finds the source entries with a default quantity, i.e. a non-zero `Qty` before merging.
 
-    bom: A dict returned from the `extract_model_data()` function
     parts: A dict returned from `data_parser.import_source_data()`
+
+    Returns: a `list` of part IDs, in source order
+    """
+    return [part_id for (part_id, part) in parts.items() if part['Qty'] != 0]
+
+def merge_source_data(bom: list,
+                      parts: Mapping,
+                      include_materials: bool = True,
+                      include_supplies: bool = True,
+                      defaults: list = None) -> tuple:
+    """
+    Takes in part data from a model (`bom`) and source information (`parts`) and combines them into
+    the rows of a bill of materials. `parts` is not modified. Flags modify if default values for
+    materials and supplies are included.
+
+    bom: A list returned from the `extract_model_data()` function
+    parts: A dict returned from `data_parser.import_source_data()`, or a `SourceCatalog`
     include_materials: A flag to include fabrication materials.
     include_supplies: A flag to include basic supplies for assembly and maintenance.
+    defaults: The IDs from `default_ids(parts)`. Pass them in when merging against the same source
+        more than once; catalogs from `catalog_cache` carry them as `defaults`.
+
+    Returns: a `tuple` of an `OrderedDict` of `PartRecord`s with only the non-empty rows, sorted by
+    part ID, and a `list` of model part IDs missing from `parts`
     """
     problems = []
+    counts = {}
     for line in bom:
         line_id = line['ID']
-        if not line_id in parts.keys():
+        if not line_id in parts:
             problems.append(line_id)
             continue
         elif line['count'] == 0:
@@ -77,9 +243,24 @@ def merge_source_data(bom: dict,
         elif line_id.startswith(config.PART_PREFIX) \
                 or (include_materials and line_id.startswith(config.MATERIAL_PREFIX)) \
                 or (include_supplies and line_id.startswith(config.SUPPLY_PREFIX)):
-            try:
-                parts[line_id]['Qty'] = line['count']
-            except Exception as e:
-                futil.log(f'{line_id} failed: {line}')
-                continue
-    return (parts, problems)
\ No newline at end of file
+            counts[line_id] = counts.get(line_id, 0) + line['count']
+
+    if defaults is None:
+        defaults = getattr(parts, 'defaults', None)
+        if defaults is None:
+            defaults = default_ids(parts)
+    for part_id in defaults:
+        # Model counts replace the default quantity
+        if part_id in counts \
+                or (not include_materials and part_id.startswith(config.MATERIAL_PREFIX)) \
+                or (not include_supplies and part_id.startswith(config.SUPPLY_PREFIX)):
+            continue
+        counts[part_id] = None
+
+    result = OrderedDict()
+    for part_id in sorted(counts):
+        row = parts[part_id]
+        if counts[part_id] is not None:
+            row = row.replace(Qty=counts[part_id])
+        result[part_id] = row
+    return (result, problems)
@@ -0,0 +1,191 @@
+#catalog_cache.py
+import hashlib, io, os, pickle, threading
+from typing import Mapping
+
+from . import atomic_write, bom, data_parser, lazy_catalog
+from ... import config
+
+# Bump when the on-disk snapshot layout or the parsed row layout changes.
+SNAPSHOT_VERSION = 2
+SNAPSHOT_EXTENSION = '.catalog'
+
+class SourceCatalog(Mapping):
+    """
+    A read-only view of parsed source data, as returned by `data_parser.import_source_data()`.
+    Parts are immutable `PartRecord`s, so they are handed out as they are.
+    `defaults` lists the parts with a default quantity, for `bom.merge_source_data()`, and
+    `issues` the problems found while parsing; see `data_parser.check_row()`.
+    """
+    def __init__(self, parts: dict, filepath: str, digest: str, issues: tuple = ()) -> None:
+        self._parts = parts
+        self.filepath = filepath
+        self.digest = digest
+        self.defaults = tuple(bom.default_ids(parts))
+        self.issues = tuple(issues)
+
+    def __getitem__(self, part_id: str) -> data_parser.PartRecord:
+        return self._parts[part_id]
+
+    def __contains__(self, part_id: object) -> bool:
+        return part_id in self._parts
+
+    def __iter__(self):
+        return iter(self._parts)
+
+    def __len__(self) -> int:
+        return len(self._parts)
+
+class LayeredCatalog(Mapping):
+    """
+    Resolves part IDs through an ordered list of catalogs, e.g. local overrides, then a vendor
+    catalog, then the base Clock 3 catalog. The first layer that has a part wins. Layers are not
+    merged; a lookup checks each layer's index in turn, so it costs at most one dict lookup per layer.
+    """
+    def __init__(self, layers: list) -> None:
+        self.layers = tuple(layers)
+        # A default only counts if no earlier layer overrides the part
+        defaults = []
+        for (index, layer) in enumerate(self.layers):
+            earlier = self.layers[:index]
+            defaults.extend(part_id for part_id in layer.defaults
+                            if not any(part_id in other for other in earlier))
+        self.defaults = tuple(defaults)
+        self.issues = tuple(f'{os.path.basename(layer.filepath)}: {issue}' for layer in self.layers for issue in layer.issues)
+
+    def __getitem__(self, part_id: str) -> data_parser.PartRecord:
+        for layer in self.layers:
+            if part_id in layer:
+                return layer[part_id]
+        raise KeyError(part_id)
+
+    def __contains__(self, part_id: object) -> bool:
+        return any(part_id in layer for layer in self.layers)
+
+    def __iter__(self):
+        for (index, layer) in enumerate(self.layers):
+            earlier = self.layers[:index]
+            for part_id in layer:
+                if not any(part_id in other for other in earlier):
+                    yield part_id
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def close(self) -> None:
+        """
+        Unmaps any lazily parsed layers. See `lazy_catalog.LazyCatalog.close()`.
+        """
+        for layer in self.layers:
+            if isinstance(layer, lazy_catalog.LazyCatalog):
+                layer.close()
+
+    def layer_names(self) -> list:
+        """
+        Returns the file names of the layers, in lookup order.
+        """
+        return [os.path.basename(layer.filepath) for layer in self.layers]
+
+class _CacheEntry:
+    __slots__ = ('mtime_ns', 'size', 'digest', 'catalog')
+
+    def __init__(self, mtime_ns: int, size: int, digest: str, catalog: SourceCatalog) -> None:
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.catalog = catalog
+
+# Session cache, keyed on (normalized path, include_defaults)
+_entries = {}
+_lock = threading.Lock()
+
+def load_source_data(filepath: str, include_defaults: bool = True) -> SourceCatalog:
+    """
+    Cached version of `data_parser.import_source_data()`. The file is only parsed again if its
+    modification time or size changed *and* its content hash differs from the cached copy.
+    Parsed catalogs are kept in memory for the session and snapshotted to `config.CACHE_PATH`
+    so they survive restarts. Files of `config.LAZY_CATALOG_SIZE` or more are opened as a
+    `lazy_catalog.LazyCatalog` instead, which parses only the rows that are looked up.
+
+    filepath: A string with the full file path and name.
+    include_defaults: If `True`, includes default values hard-coded into the .csv.
+
+    Returns a read-only `SourceCatalog` or `LazyCatalog`.
+    """
+    path = os.path.normcase(os.path.abspath(filepath))
+    key = (path, include_defaults)
+    try:
+        with _lock:
+            stat = os.stat(path)
+            entry = _entries.get(key)
+            if stat.st_size >= config.LAZY_CATALOG_SIZE:
+                if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size \
+                        or not isinstance(entry.catalog, lazy_catalog.LazyCatalog):
+                    entry = _CacheEntry(stat.st_mtime_ns, stat.st_size, None, lazy_catalog.open_catalog(path, include_defaults))
+                    _entries[key] = entry
+                return entry.catalog
+            if entry is None:
+                entry = _read_snapshot(path, include_defaults)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                _entries[key] = entry
+                return entry.catalog
+
+            with open(path, 'rb') as datafile:
+                raw = datafile.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry is None or entry.digest != digest:
+                issues = []
+                parts = data_parser.read_source_data(io.TextIOWrapper(io.BytesIO(raw), newline=''), include_defaults, issues)
+                catalog = SourceCatalog(parts, path, digest, issues)
+            else:
+                # Touched but unchanged; keep the parsed data
+                catalog = entry.catalog
+            entry = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, catalog)
+            _entries[key] = entry
+            _write_snapshot(path, include_defaults, entry)
+            return catalog
+    except Exception as e:
+        raise data_parser.ImportError('Failed to process source file') from e
+
+def load_catalogs(filepaths: list, include_defaults: bool = True) -> LayeredCatalog:
+    """
+    Loads several source files as one `LayeredCatalog`. Each file is loaded, and cached, on its own
+    with `load_source_data()`.
+
+    filepaths: Source file paths in lookup order; parts in earlier files override later ones.
+    include_defaults: If `True`, includes default values hard-coded into the .csv files.
+    """
+    return LayeredCatalog([load_source_data(filepath, include_defaults) for filepath in filepaths])
+
+def clear() -> None:
+    """
+    Drops all catalogs cached in memory. Snapshots on disk are left in place.
+    """
+    with _lock:
+        _entries.clear()
+
+def _snapshot_path(path: str, include_defaults: bool) -> str:
+    name = hashlib.sha1(f'{path}|{include_defaults}'.encode('utf-8')).hexdigest()
+    return os.path.join(config.CACHE_PATH, name + SNAPSHOT_EXTENSION)
+
+def _read_snapshot(path: str, include_defaults: bool) -> _CacheEntry:
+    """
+    Loads a parsed catalog from disk. Returns `None` if there is no usable snapshot.
+    """
+    try:
+        with open(_snapshot_path(path, include_defaults), 'rb') as snapfile:
+            (version, snap_path, mtime_ns, size, digest, fields, rows, issues) = pickle.load(snapfile)
+    except Exception:
+        return None
+    if version != SNAPSHOT_VERSION or snap_path != path or fields != data_parser.PART_FIELDS:
+        return None
+    parts = {row[0]: data_parser.PartRecord(*row[1:]) for row in rows}
+    return _CacheEntry(mtime_ns, size, digest, SourceCatalog(parts, path, digest, issues))
+
+def _write_snapshot(path: str, include_defaults: bool, entry: _CacheEntry) -> None:
+    """
+    Stores a parsed catalog on disk as a list of row tuples.
+    """
+    fields = data_parser.PART_FIELDS
+    rows = [(part_id,) + part.astuple() for (part_id, part) in entry.catalog._parts.items()]
+    snapshot = (SNAPSHOT_VERSION, path, entry.mtime_ns, entry.size, entry.digest, fields, rows, entry.catalog.issues)
+    atomic_write.dump_pickle(_snapshot_path(path, include_defaults), snapshot)
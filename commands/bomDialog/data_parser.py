@@ -1,5 +1,8 @@
-import csv
-from typing import OrderedDict
+import csv, gzip, io, sys
+from operator import itemgetter
+from typing import Iterable, Mapping, OrderedDict, TextIO
+
+from . import atomic_write
 
 ####
 # CSV Columns/Headers
@@ -12,30 +15,145 @@ from typing import OrderedDict
 # ('ID', 'Type', 'Description', 'UOM', 'Qty', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
 #
 
+SOURCE_FIELDS = ('ID', 'Type', 'Description', 'UOM', 'DefaultValue', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
+EXPORT_FIELDS = ('ID', 'Type', 'Description', 'UOM', 'Qty', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
+# Keys of each part entry returned by `import_source_data()`
+PART_FIELDS = ('Type', 'Description', 'UOM', 'Qty', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
+# Extra columns written after `EXPORT_FIELDS` when masses are exported: mass of one, and of `Qty`, in kg
+MASS_FIELDS = ('Mass', 'TotalMass')
+# Decimal places of exported masses, in kg: to the milligram
+MASS_DIGITS = 6
+
+# Buffer size for streamed exports; rows are small, so batch them into large writes
+WRITE_BUFFER_SIZE = 1 << 16
+
 class ImportError(Exception):
     pass
 
 class ExportError(Exception):
     pass
 
-def parse_row_data(row: OrderedDict[str, str], include_value = False) -> dict:
-    """
-    Called by `import_source_data()` to parse through a row of CSV data.
-    """
-    result = {
-            'Type': row['Type'],
-            'Description': row['Description'],
-            'UOM': row['UOM'],
-            'Qty' : 0, #we read in the default value later
-            'RefSupplier': row['RefSupplier'],
-            'RefUrl': row['RefUrl'],
-            'RefMfgr': row['RefMfgr'],
-            'RefMfgrPN': row['RefMfgrPN'],
-            'Notes': row['Notes'] 
-        }
+class PartRecord(tuple, Mapping):
+    """
+    One part entry from the source file. Records are immutable tuples of the values in
+    `PART_FIELDS` order, which take a fraction of the memory of a dict per row, but they read like
+    a dict: `part['Qty']`, `part.get()`, `dict(part)`. Use `replace()` to get a copy with different
+    values.
+    """
+    __slots__ = ()
+
+    def __new__(cls, *values) -> 'PartRecord':
+        if len(values) != len(PART_FIELDS):
+            raise TypeError(f'PartRecord takes {len(PART_FIELDS)} values, got {len(values)}')
+        return tuple.__new__(cls, values)
+
+    def __getnewargs__(self) -> tuple:
+        return self.astuple()
+
+    def __getitem__(self, key: str):
+        return tuple.__getitem__(self, _PART_FIELD_INDEX[key])
+
+    def __contains__(self, key: object) -> bool:
+        return key in _PART_FIELD_INDEX
+
+    def __iter__(self):
+        return iter(PART_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PartRecord):
+            return tuple.__eq__(self, other)
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other: object) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self) -> str:
+        return f'PartRecord({dict(self.items())!r})'
+
+    def astuple(self) -> tuple:
+        """
+        Returns the values in `PART_FIELDS` order.
+        """
+        return tuple.__getitem__(self, slice(None))
+
+    def replace(self, **changes) -> 'PartRecord':
+        """
+        Returns a copy with the given fields changed, e.g. `part.replace(Qty=4)`.
+        """
+        values = list(self.astuple())
+        for (key, value) in changes.items():
+            values[_PART_FIELD_INDEX[key]] = value
+        return tuple.__new__(PartRecord, values)
+
+_PART_FIELD_INDEX = {field: index for (index, field) in enumerate(PART_FIELDS)}
+
+def _intern(value: str) -> str:
+    # Short rows leave trailing fields as None
+    return sys.intern(value) if value is not None else None
+
+def parse_row_data(row: OrderedDict[str, str], include_value = False) -> PartRecord:
+    """
+    Called by `import_source_data()` to parse through a row of CSV data. Type, UOM, supplier and
+    manufacturer repeat across many rows, so they are interned and each value is stored once.
+    """
+    qty = 0 #we read in the default value later
     if include_value and row['DefaultValue'] is not None and row['DefaultValue'].isnumeric():
-        result['Qty'] = int(row['DefaultValue'])
-    return result
+        qty = int(row['DefaultValue'])
+    return PartRecord(_intern(row['Type']),
+                      row['Description'],
+                      _intern(row['UOM']),
+                      qty,
+                      _intern(row['RefSupplier']),
+                      row['RefUrl'],
+                      _intern(row['RefMfgr']),
+                      row['RefMfgrPN'],
+                      row['Notes'])
+
+def row_dict(values: list) -> dict:
+    """
+    Maps the fields of a row from `csv.reader` to `SOURCE_FIELDS` the way `csv.DictReader` does:
+    missing fields are `None` and extra fields are listed under the key `None`.
+    """
+    count = len(SOURCE_FIELDS)
+    row = dict(zip(SOURCE_FIELDS, values))
+    if len(values) < count:
+        for field in SOURCE_FIELDS[len(values):]:
+            row[field] = None
+    elif len(values) > count:
+        row[None] = values[count:]
+    return row
+
+def check_row(row: dict, line: int, seen: dict, issues: list) -> None:
+    """
+    Checks one row of source data and appends a message to `issues` for each problem found:
+    a wrong number of fields, a missing ID, a default quantity that is not a whole number, or an
+    ID that an earlier row already uses.
+
+    row: A row from `csv.DictReader` or `row_dict()`.
+    line: The line number to report.
+    seen: The IDs of earlier rows, mapped to their line numbers. This row is added.
+    issues: A list of strings to append to.
+    """
+    part_id = row['ID']
+    # Short rows end in None and long rows have extras under None; count fields only then
+    if row[SOURCE_FIELDS[-1]] is None or None in row:
+        fields = sum(1 for field in SOURCE_FIELDS if row[field] is not None) + len(row.get(None, ()))
+        issues.append(f'Line {line}: {part_id or "row"} has {fields} fields; {len(SOURCE_FIELDS)} are expected')
+    if not part_id:
+        issues.append(f'Line {line}: missing part ID')
+        return
+    default = row['DefaultValue']
+    if default and not default.isnumeric():
+        issues.append(f"Line {line}: {part_id} has a default quantity that is not a whole number: '{default}'")
+    first = seen.get(part_id)
+    if first is not None:
+        issues.append(f'Line {line}: {part_id} is also on line {first}; this row replaces it')
+    seen[part_id] = line
 
 def import_source_data(filepath: str = None,
                        include_defaults: bool = True) -> dict:
@@ -47,41 +165,109 @@ def import_source_data(filepath: str = None,
     include_materials: If `True`, include materials that need fabrication. This is useful for the master BOM.
     include_supplies: If `True`, include miscellaneous supplies for assembling and maintaining the printer.
 
-    Returns a dict of dicts with string keys. The part number is the key, e.g. 'PN001' is a key.
+    Returns a dict of `PartRecord`s with string keys. The part number is the key, e.g. 'PN001' is a key.
     """
     try:
-        raw_result = {}
         with open(filepath, 'r', newline='') as datafile:
-            fieldnames=('ID', 'Type', 'Description', 'UOM', 'DefaultValue', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
-            reader = csv.DictReader(datafile, fieldnames=fieldnames, dialect='excel')
-            for row in reader:
-                raw_result[row['ID']] = parse_row_data(row, include_defaults)
-        keys = sorted(raw_result.keys())
-        result = OrderedDict()
-        for key in keys:
-            result[key] = raw_result[key]
-        return result
+            return read_source_data(datafile, include_defaults)
     except Exception as e:
         raise ImportError('Failed to process source file') from e
 
-def export_csv_bom(filepath: str, data: dict) -> None:
+def read_source_data(datafile: TextIO, include_defaults: bool = True, issues: list = None) -> dict:
+    """
+    Parses source data from an open text file. See `import_source_data()`.
+
+    datafile: A file object opened in text mode with `newline=''`.
+    include_defaults: If `True`, includes default values hard-coded into the .csv.
+    issues: If given, problems with the data are appended to it; see `check_row()`.
+
+    Returns a dict of `PartRecord`s with string keys, sorted by part number.
+    """
+    raw_result = {}
+    seen = {}
+    reader = csv.DictReader(datafile, fieldnames=SOURCE_FIELDS, dialect='excel')
+    for row in reader:
+        if issues is not None:
+            check_row(row, reader.line_num, seen, issues)
+        raw_result[row['ID']] = parse_row_data(row, include_defaults)
+    keys = sorted(raw_result.keys())
+    result = OrderedDict()
+    for key in keys:
+        result[key] = raw_result[key]
+    return result
+
+def export_csv_bom(filepath: str, data: dict, masses: dict = None) -> bool:
     """
-    Exports data for a bill of materials.
+    Exports data for a bill of materials. Paths ending in `.gz` are written gzip-compressed. The file
+    is replaced atomically, and only if its content changes; see `atomic_write.write_if_changed()`.
 
     filepath: A string with the full file path and name.
     data: A dict containing the data to export.
+    masses: Optional part masses, as `mass_cache.part_masses()`, to add the `MASS_FIELDS` columns.
+
+    Returns: `True` if the file was written, `False` if it already had this content.
     """
+    compress = filepath.endswith('.gz')
     try:
-        with open(filepath, 'w', newline='') as datafile:
-            fieldnames=('ID', 'Type', 'Description', 'UOM', 'Qty', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
-            writer = csv.DictWriter(datafile, fieldnames, dialect=csv.excel)
-            writer.writeheader()
-            for part_num in data.keys():
-                if data[part_num]['Qty'] == 0:
-                    continue
-                outdata = data[part_num]
-                outdata['ID'] = part_num
-                writer.writerow(outdata)
-                
+        return atomic_write.write_if_changed(filepath, lambda path: write_csv_bom(path, data.items(), compress, masses))
+    except ExportError:
+        raise
     except Exception as e:
-        raise ExportError('Failed to export data') from e
\ No newline at end of file
+        raise ExportError('Failed to export data') from e
+
+def write_csv_bom(filepath: str, parts: Iterable, compress: bool = False, masses: dict = None) -> int:
+    """
+    Streams part records to a bill of materials file. Records are read but never modified, and
+    only one row is held in memory at a time. Parts with a `Qty` of zero are skipped.
+
+    filepath: A string with the full file path and name.
+    parts: An iterable of `(part_id, part)` pairs, e.g. `data.items()` or a generator.
+    compress: If `True`, the file is written gzip-compressed. The gzip header has no time stamp or
+        file name, so the same rows always give the same bytes.
+    masses: Optional part masses by ID, to add the `MASS_FIELDS` columns. Parts without a mass,
+        e.g. supplies, leave them empty.
+
+    Returns: the number of parts written.
+    """
+    try:
+        if compress:
+            with open(filepath, 'wb') as rawfile:
+                gzfile = gzip.GzipFile(filename='', mode='wb', fileobj=rawfile, mtime=0)
+                with io.TextIOWrapper(gzfile, newline='') as datafile:
+                    return _write_csv_rows(datafile, parts, masses)
+        with open(filepath, 'w', newline='', buffering=WRITE_BUFFER_SIZE) as datafile:
+            return _write_csv_rows(datafile, parts, masses)
+    except Exception as e:
+        raise ExportError('Failed to export data') from e
+
+def mass_values(part_id: str, qty, masses: dict) -> tuple:
+    """
+    Returns the `MASS_FIELDS` values for a row, rounded to `MASS_DIGITS`, or `(None, None)` if
+    the part has no mass.
+    """
+    mass = masses.get(part_id)
+    if mass is None:
+        return (None, None)
+    return (round(mass, MASS_DIGITS), round(mass * qty, MASS_DIGITS))
+
+def _write_csv_rows(datafile: TextIO, parts: Iterable, masses: dict = None) -> int:
+    row_values = itemgetter(*EXPORT_FIELDS[1:])
+    count = 0
+    writer = csv.writer(datafile, dialect=csv.excel)
+    if masses is None:
+        writer.writerow(EXPORT_FIELDS)
+    else:
+        writer.writerow(EXPORT_FIELDS + MASS_FIELDS)
+    for (part_num, part) in parts:
+        if part['Qty'] == 0:
+            continue
+        if type(part) is PartRecord:
+            row = (part_num,) + part
+        else:
+            row = (part_num,) + row_values(part)
+        if masses is not None:
+            # csv writes None as an empty field
+            row += mass_values(part_num, part['Qty'], masses)
+        writer.writerow(row)
+        count += 1
+    return count
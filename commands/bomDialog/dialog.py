@@ -3,16 +3,100 @@
 #
 #Based on the fairly elementary ExportBOM script that ships with Fusion.
 
-import adsk.core, adsk.fusion, traceback, os
+import adsk.core, adsk.fusion, traceback, os, json, logging
 
 from ...lib import fusion360utils as futil
 
-from . import data_parser, bom, markdown_exporter
-from ... import config
+from . import bom, live_bom, mass_cache, pipeline
+from ... import config, logger, tracing
+
+log = logging.getLogger(__name__)
 
 INITIAL_FILENAME = 'bom.csv'
-CSV_FILTER = 'Comma Separated Values(*.csv);;All files(*.*)'
+CSV_FILTER = 'Comma Separated Values(*.csv);;Compressed CSV(*.csv.gz);;All files(*.*)'
 MARKDOWN_FILTER = 'Markdown Files(*.md);;All files(*.*)'
+SNAPSHOT_FILTER = 'Occurrence Snapshots(*.c3snap);;JSON Snapshots(*.json);;All files(*.*)'
+JSON_FILTER = 'JSON Files(*.json);;All files(*.*)'
+# File filter, default extension and accepted extensions for each export format, by drop down index
+FORMAT_FILTERS = (CSV_FILTER, MARKDOWN_FILTER, SNAPSHOT_FILTER, JSON_FILTER)
+FORMAT_EXTENSIONS = ('.csv', '.md', '.c3snap', '.json')
+FORMAT_ALL_EXTENSIONS = (('.csv.gz', '.csv'), ('.md',), ('.c3snap', '.json'), ('.json',))
+EXPORT_EVENT_ID = f'{config.ADDIN_PREFIX}_bomExportDone'
+SOURCE_CHECKED_EVENT_ID = f'{config.ADDIN_PREFIX}_bomSourceChecked'
+# Source problems listed in the dialog; the rest are only logged
+MAX_SHOWN_ISSUES = 8
+
+_export_event = None
+_source_checked_event = None
+# The open dialog, if any, for reporting background source checks
+_active_dialog = None
+
+def register_events() -> None:
+    """
+    Registers the custom events used to report finished exports and source checks back to the
+    main thread.
+    """
+    global _export_event, _source_checked_event
+    app = adsk.core.Application.get()
+    _export_event = app.registerCustomEvent(EXPORT_EVENT_ID)
+    futil.add_handler(_export_event, _export_done)
+    _source_checked_event = app.registerCustomEvent(SOURCE_CHECKED_EVENT_ID)
+    futil.add_handler(_source_checked_event, _source_checked)
+
+def unregister_events() -> None:
+    """
+    Cancels any running export and unregisters the custom events.
+    """
+    global _export_event, _source_checked_event
+    pipeline.shutdown()
+    app = adsk.core.Application.get()
+    if _export_event is not None:
+        app.unregisterCustomEvent(EXPORT_EVENT_ID)
+        _export_event = None
+    if _source_checked_event is not None:
+        app.unregisterCustomEvent(SOURCE_CHECKED_EVENT_ID)
+        _source_checked_event = None
+
+def _notify_export_done(result: dict) -> None:
+    # Called on the worker thread; hand the result to the main thread
+    adsk.core.Application.get().fireCustomEvent(EXPORT_EVENT_ID, json.dumps(result))
+
+def _export_done(args: adsk.core.CustomEventArgs) -> None:
+    """
+    Reports the result of an export on the main thread.
+    """
+    ui = adsk.core.Application.get().userInterface
+    result = json.loads(args.additionalInfo)
+    tracing.log_summary(result.get('trace', ''))
+    status = result['status']
+    if status == pipeline.STATUS_DONE:
+        lines = ['{}: {}'.format('Updated' if updated else 'Unchanged', path)
+                 for (path, updated) in zip(result['written'], result['updated'])]
+        ui.messageBox('Bill of Materials extracted to:\n{}'.format('\n'.join(lines)), 'Extract BOM')
+    elif status == pipeline.STATUS_PROBLEMS:
+        ui.messageBox('{}\n\nSearched: {}'.format(result['problems'], ', '.join(result['searched'])),
+                      'Parts not found in source files')
+    elif status == pipeline.STATUS_ERROR:
+        log.error('Export failed:\n%s', result['message'])
+        futil.log(f'Export failed. Recent log records:\n{logger.dump()}')
+        ui.messageBox('Failed:\n{}'.format(result['message']), 'Warning')
+    else:
+        futil.log('Bill of Materials export cancelled')
+
+def _notify_source_checked(result: dict) -> None:
+    # Called on the worker thread; hand the result to the main thread
+    adsk.core.Application.get().fireCustomEvent(SOURCE_CHECKED_EVENT_ID, json.dumps(result))
+
+def _source_checked(args: adsk.core.CustomEventArgs) -> None:
+    """
+    Shows the result of a background source check in the open dialog.
+    """
+    result = json.loads(args.additionalInfo)
+    for issue in result.get('issues', ()):
+        futil.log(f'Source file: {issue}')
+    if _active_dialog is not None:
+        _active_dialog.showSourceCheck(result)
+
 class Dialog:
     def __init__(self, command: adsk.core.Command, command_prefix: str, resource_path: str, local_handlers: list,) -> None:
         self.app = adsk.core.Application.get()
@@ -36,7 +120,9 @@ class Dialog:
 # Command Inputs:
 # Files Group Box       'fileGroup'         GroupCommandInput
 #   Source File         'sourceBox'         BoolValueInput
+#   Override File       'overrideBox'       BoolValueInput
 #   Source Text         'sourceTextBox'     TextBoxCommandInput
+#   Source Check Text   'sourceCheckBox'    TextBoxCommandInput
 #   Export Format       'exportFormatBox'   DropDownCommandInput
 #   Export Dest         'exportDestBox'     BoolValueInput
 #   Export Dest Text    'exportDestTextBox' TextBoxCommandInput
@@ -46,6 +132,8 @@ class Dialog:
 # Options Group Box     'optionsGroup'      GroupCommandInput
 #   Materials Button    'materialsButton'   BoolValueInput
 #   Supplies Button     'suppliesButton'    BoolValueInput
+#   Live Button         'liveButton'        BoolValueInput
+#   Mass Button         'massButton'        BoolValueInput
 class BomDialog(Dialog):
     """
     Controls the `CommandInput` objects and reacts to Command events.
@@ -53,10 +141,13 @@ class BomDialog(Dialog):
 
     def __init__(self, command: adsk.core.Command, command_prefix: str, resource_path: str, local_handlers) -> None:
         super().__init__(command, command_prefix, resource_path, local_handlers)
-        futil.log(f'Bill of Materials Command Created Event')
+        log.debug('Bill of Materials Command Created Event')
 
-        self.currentSource = os.path.normpath(os.path.join(config.ADDIN_PATH, 'source.csv'))
-        self.currentDest = os.path.normpath(os.path.join(config.ADDIN_PATH, 'bill_of_materials.csv'))
+        # Source files in lookup order: overrides first, the base catalog last
+        self.currentSources = [os.path.normpath(os.path.join(config.ADDIN_PATH, 'source.csv'))]
+        # Every selected format is written next to the others: destBase plus its extension
+        self.destBase = os.path.normpath(os.path.join(config.ADDIN_PATH, 'bill_of_materials'))
+        self.destExtensions = list(FORMAT_EXTENSIONS)
 
         # File Group Box
         group = self.inputs.addGroupCommandInput(self.inputFullName('fileGroup'), 'Files')
@@ -65,28 +156,40 @@ class BomDialog(Dialog):
         sourceBox = children.addBoolValueInput(self.inputFullName('sourceBox'),
                                     'Source File', False, os.path.join(self.resource_path, 'import'))
         sourceBox.text = 'Set source file...'
-        sourceBox.tooltip = 'Click to change the source file to process.'
+        sourceBox.tooltip = 'Click to change the source file to process. This also clears any override files.'
+
+        overrideBox = children.addBoolValueInput(self.inputFullName('overrideBox'),
+                                    'Override File', False, os.path.join(self.resource_path, 'import'))
+        overrideBox.text = 'Add override files...'
+        overrideBox.tooltip = 'Click to add vendor or local catalogs. Their parts take precedence over the files already listed.'
 
-        sourceTextBox = children.addTextBoxCommandInput(self.inputFullName('sourceTextBox'), 'Source File:', self.currentSource, 2, True)
+        sourceTextBox = children.addTextBoxCommandInput(self.inputFullName('sourceTextBox'), 'Source Files:', self.sourceText(), 3, True)
         sourceTextBox.isFullWidth = True
-        sourceTextBox.tooltip = 'This is the current source .csv file to process.'
+        sourceTextBox.tooltip = 'These are the source .csv files to process. Each part is taken from the first file that lists it.'
         sourceTextBox.tooltipDescription = 'This file must be properly properly formatted. The latest version is in the Clock 3 git repository.'
 
+        sourceCheckBox = children.addTextBoxCommandInput(self.inputFullName('sourceCheckBox'), 'Source Check:', '', 1, True)
+        sourceCheckBox.isFullWidth = True
+        sourceCheckBox.tooltip = 'Problems found in the source files. They are read in the background so exporting is quick.'
+        self.sourceError = False
+
         exportFormatBox = children.addDropDownCommandInput(self.inputFullName('exportFormatBox'),
-                                    'Export Format', adsk.core.DropDownStyles.LabeledIconDropDownStyle)
+                                    'Export Formats', adsk.core.DropDownStyles.CheckBoxDropDownStyle)
+        exportFormatBox.tooltip = 'Every checked format is written from the same merged data.'
         items = exportFormatBox.listItems
         items.add('Comma Separated Values', True)
         items.add('Markdown File', False)
+        items.add('Occurrence Snapshot', False)
+        items.add('JSON for Tooling', False)
 
         exportDestBox = children.addBoolValueInput(self.inputFullName('exportDestBox'),
                                     'Export File Location', False,  os.path.join(self.resource_path, 'export'))
         exportDestBox.text='Set destination file...'
-        exportDestBox.tooltip='Click to change the output file and/or path for the bill of materials.'
-        exportDestBox.tooltipDescription = 'The file must be a comma separated value (.csv) file.'
+        exportDestBox.tooltip='Click to change the output file name and/or path for the bill of materials.'
+        exportDestBox.tooltipDescription = 'The other checked formats are written to the same name with their own extension.'
 
-        exportDestTextBox = children.addTextBoxCommandInput(self.inputFullName('exportDestTextBox'), 'Export file:', self.currentDest, 2, True)
+        exportDestTextBox = children.addTextBoxCommandInput(self.inputFullName('exportDestTextBox'), 'Export files:', self.destText(), 2, True)
         exportDestTextBox.tooltip = 'The bill of materials will be output here.'
-        exportDestTextBox.tooltipDescription = 'The file must be a comma separated value (.csv) file.'
         exportDestTextBox.isFullWidth = True
         
         # Component selection group box        
@@ -115,22 +218,41 @@ class BomDialog(Dialog):
         button.tooltip = 'Include raw materials that require assembly, such as insulation, wires, and connectors'
         button = children.addBoolValueInput(self.inputFullName('suppliesButton'), 'Include miscellaneous supplies', True, '', True)
         button.tooltip = 'Include assembly supplies such as wire strippers and lubricants'
+        button = children.addBoolValueInput(self.inputFullName('liveButton'), 'Keep counts up to date', True, '', live_bom.current() is not None)
+        button.tooltip = 'Track changes to the design between exports so "Export all" does not recount everything'
+        button = children.addBoolValueInput(self.inputFullName('massButton'), 'Include mass', True, '', False)
+        button.tooltip = 'Add the mass of each part and line to CSV and JSON exports. Masses are cached until a component changes.'
 
         futil.add_handler(command.execute, self.executeEvent, local_handlers=local_handlers)
         futil.add_handler(command.inputChanged, self.inputEvent, local_handlers=local_handlers)
         futil.add_handler(command.validateInputs, self.validateInputs, local_handlers=local_handlers)
         futil.add_handler(command.select, self.selectionEvent, local_handlers=local_handlers)
+        futil.add_handler(command.destroy, self.destroyEvent, local_handlers=local_handlers)
         # futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
 
         command.setDialogInitialSize(600, 600)
 
+        global _active_dialog
+        _active_dialog = self
+        self.checkSources()
+
+    def destroyEvent(self, args: adsk.core.CommandEventArgs) -> None:
+        global _active_dialog
+        if _active_dialog is self:
+            _active_dialog = None
+
     def validateInputs(self, args: adsk.core.ValidateInputsEventArgs) -> None:
         """
         Checks that user input is valid and disables the 'OK' button if it is not.
         """
-        if not os.path.exists(os.path.split(self.currentDest)[0]):
+        destinations = [path for (_, path) in self.destinations()]
+        if len(destinations) == 0 or len(set(destinations)) != len(destinations):
             args.areInputsValid = False
-        elif not os.path.exists(self.currentSource):
+        elif not os.path.exists(os.path.split(self.destBase)[0]):
+            args.areInputsValid = False
+        elif not all(os.path.exists(source) for source in self.currentSources):
+            args.areInputsValid = False
+        elif self.sourceError:
             args.areInputsValid = False
         else:
             args.areInputsValid = True
@@ -147,42 +269,65 @@ class BomDialog(Dialog):
         is toggled on.
         """
         if args.input == self.inputByShortName('sourceBox'):
-            res = os.path.normpath(self.showFileDialog('Select source file', *os.path.split(self.currentSource), False, CSV_FILTER, 0, False))
+            res = os.path.normpath(self.showFileDialog('Select source file', *os.path.split(self.currentSources[-1]), False, CSV_FILTER, 0, False))
             if len(res) and os.path.exists(res):
-                box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('sourceTextBox'))
-                assert(box)
-                self.currentSource = res
-                box.text = res
+                self.currentSources = [res]
+                self.updateSourceText()
+                self.checkSources()
+        elif args.input == self.inputByShortName('overrideBox'):
+            res = self.showFileDialog('Select override files', '', os.path.dirname(self.currentSources[0]), False, CSV_FILTER, 0, True)
+            added = [os.path.normpath(path) for path in res if os.path.exists(path)]
+            if len(added):
+                self.currentSources = added + [path for path in self.currentSources if path not in added]
+                self.updateSourceText()
+                self.checkSources()
         elif args.input == self.inputByShortName('exportDestBox'):
-            if self.formatBoxIndex() == 0:
-                filter = CSV_FILTER
-            else:
-                filter = MARKDOWN_FILTER                
-            res = os.path.normpath(self.showFileDialog('Select output file', *os.path.split(self.currentDest), True, filter, 0, False))
+            formats = self.selectedFormats() or [pipeline.FORMAT_CSV]
+            primary = formats[0]
+            current = self.destBase + self.destExtensions[primary]
+            res = os.path.normpath(self.showFileDialog('Select output file', os.path.basename(current), os.path.dirname(current),
+                                                       True, FORMAT_FILTERS[primary], 0, False))
             if len(res) and os.path.exists(os.path.split(res)[0]):
-                box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('exportDestTextBox'))
-                assert(box)
-                box.text = res
-                self.currentDest = res
+                # Keep a recognized extension, e.g. .csv.gz, for the format the file was picked for
+                for ext in FORMAT_ALL_EXTENSIONS[primary]:
+                    if res.endswith(ext):
+                        self.destExtensions[primary] = ext
+                        res = res[:-len(ext)]
+                        break
+                self.destBase = res
+                self.updateDestText()
         elif args.input == self.inputByShortName('exportType'):
             self.updateSelectedIndex()
         elif args.input == self.inputByShortName('exportFormatBox'):
-            formatBox = adsk.core.DropDownCommandInput.cast(args.input)
-            old_path = self.currentDest
-            if formatBox.selectedItem.index == 0 and old_path.endswith('.md'):
-                new_path = old_path.removesuffix('.md') + '.csv'
-            elif formatBox.selectedItem.index == 1 and old_path.endswith('.csv'):
-                new_path = old_path.removesuffix('.csv') + '.md'
-            else:
-                self.warn('Could not auto-correct export file extension to new format.')
-                return #bail
-            destTextBox = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('exportDestTextBox'))
-            destTextBox.text = new_path
+            self.updateDestText()
         else:
             pass
-    def formatBoxIndex(self) -> int:
-        formatBox = adsk.core.DropDownCommandInput.cast(self.inputByShortName('exportFormatBox'))
-        return formatBox.selectedItem.index
+
+    def selectedFormats(self) -> list:
+        """
+        Returns the indices of the checked export formats, e.g. `pipeline.FORMAT_CSV`.
+        """
+        items = adsk.core.DropDownCommandInput.cast(self.inputByShortName('exportFormatBox')).listItems
+        return [index for index in range(items.count) if items.item(index).isSelected]
+
+    def destinations(self) -> list:
+        """
+        Returns (format, path) pairs for the checked export formats.
+        """
+        return [(index, self.destBase + self.destExtensions[index]) for index in self.selectedFormats()]
+
+    def destText(self) -> str:
+        """
+        Returns the output files for display, one per line.
+        """
+        paths = [path for (_, path) in self.destinations()]
+        return '\n'.join(paths) if paths else 'No export format selected'
+
+    def updateDestText(self) -> None:
+        box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('exportDestTextBox'))
+        assert(box)
+        box.text = self.destText()
+        box.numRows = max(2, len(self.selectedFormats()))
 
     def executeEvent(self, event: adsk.core.CommandEventArgs) -> None:
         """
@@ -194,41 +339,43 @@ class BomDialog(Dialog):
                 self.warn('No active design: Cannot extract bill of materials', 'Extract BOM')
                 return
 
-            occurences = self.getOccurrences(design)
-
-            # Gather information about each unique component
-            model_parts = bom.extract_model_data(occurences)
-            source_data = data_parser.import_source_data(self.currentSource, True)
-            try:
-                # This does the grunt work for scraping the model
-                (parts, problems) = bom.merge_source_data(
-                        model_parts, 
-                        source_data, 
-                        self.getIncludeMaterials(), 
-                        self.getIncludeSupplies())
-                # Check for empty part IDs and clear
-                empty_ids = []
-                for (key, part) in parts.items():
-                    if part['Qty'] == 0:
-                        empty_ids.append(key)
-                for key in empty_ids:
-                    parts.pop(key)
-
-            except bom.MergeBomException as e:
-                self.warn(f'Cannot process part {e.part_id}; aborting')
-                return
-
-            if len(problems):
-                self.warn(str(problems), 'Parts not found in source file')
-            else:
-                if self.formatBoxIndex() == 0:
-                    data_parser.export_csv_bom(self.currentDest, parts)
+            # Traversal has to stay on the main thread; the rest runs on a worker
+            tracer = tracing.start('bomExport')
+            exports = self.destinations()
+            structure = None
+            # Records with components, for the mass query; structure records have none
+            counted_parts = None
+            live = self.updateLiveMode(design)
+            with tracer.stage('traversal'):
+                if any(export_format == pipeline.FORMAT_SNAPSHOT for (export_format, _) in exports) and self.export_index != 2:
+                    # Snapshots of whole components also keep how they are assembled
+                    root = design.rootComponent if self.export_index == 0 else design.activeComponent
+                    (model_parts, structure) = bom.model_structure(root)
+                    if live is not None and self.export_index == 0:
+                        # The live table takes in the changes, as for any other export of the design
+                        counted_parts = live.parts()
                 else:
-                    markdown_exporter.export_markdown_bom(self.currentDest, parts, section_key='Type', include_id=False)
-                self.ui.messageBox('Bill of Materials extracted.', 'Extract BOM')
-            
-
+                    model_parts = counted_parts = self.getModelParts(design, live)
+            masses = None
+            if self.getIncludeMass():
+                # Physical properties come from Fusion, so they are queried here rather than in the job
+                with tracer.stage('mass'):
+                    if counted_parts is None:
+                        counted_parts = bom.rollup_model_data(root)
+                    masses = mass_cache.part_masses(counted_parts)
+            job = pipeline.ExportJob(model_parts,
+                                     self.currentSources,
+                                     exports,
+                                     self.getIncludeMaterials(),
+                                     self.getIncludeSupplies(),
+                                     structure,
+                                     tracer,
+                                     masses)
+            pipeline.submit(job, _notify_export_done)
+            log.info('Export to %s started', ', '.join(path for (_, path) in exports))
         except:
+            log.exception('Export failed')
+            futil.log(f'Export failed. Recent log records:\n{logger.dump()}')
             self.warn('Failed:\n{}'.format(traceback.format_exc()))
 
     def showFileDialog(self, 
@@ -250,7 +397,7 @@ class BomDialog(Dialog):
         filter_index: Start index in the filter list.
         multi_select: Allow multiple file selections. Not compatibile with `show_save` being `True`.
 
-        Returns: a `str` with the full filepath.
+        Returns: a `str` with the full filepath, or a `list` of them if `multi_select` is `True`.
         """
         
         fileDialog = self.ui.createFileDialog()
@@ -265,9 +412,54 @@ class BomDialog(Dialog):
         else:
             res = fileDialog.showOpen()
         if res != adsk.core.DialogResults.DialogOK:
-            return ''
+            return [] if multi_select else ''
+        if multi_select:
+            return list(fileDialog.filenames)
         return fileDialog.filename
 
+    def sourceText(self) -> str:
+        """
+        Returns the source files for display, numbered in lookup order.
+        """
+        return '\n'.join(f'{index}. {path}' for (index, path) in enumerate(self.currentSources, 1))
+
+    def updateSourceText(self) -> None:
+        box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('sourceTextBox'))
+        assert(box)
+        box.text = self.sourceText()
+        box.numRows = min(len(self.currentSources) + 1, 6)
+
+    def checkSources(self) -> None:
+        """
+        Starts loading and checking the source files in the background. The result is shown by
+        `showSourceCheck()`, and the export reuses the parsed files.
+        """
+        box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('sourceCheckBox'))
+        box.text = 'Checking source files...'
+        box.numRows = 1
+        self.sourceError = False
+        pipeline.prefetch(self.currentSources, _notify_source_checked)
+
+    def showSourceCheck(self, result: dict) -> None:
+        """
+        Shows the result of `pipeline.prefetch()`, unless the source files changed since it started.
+        """
+        if result['sources'] != self.currentSources:
+            return
+        if result['status'] != pipeline.STATUS_DONE:
+            self.sourceError = True
+            lines = [f'Cannot read the source files: {result["message"]}']
+        elif result['issues']:
+            issues = result['issues']
+            lines = [f'{len(issues)} problem(s) found:'] + issues[:MAX_SHOWN_ISSUES]
+            if len(issues) > MAX_SHOWN_ISSUES:
+                lines.append(f'...and {len(issues) - MAX_SHOWN_ISSUES} more in the Text Command window')
+        else:
+            lines = [f'{sum(result["parts"])} parts, no problems found.']
+        box = adsk.core.TextBoxCommandInput.cast(self.inputByShortName('sourceCheckBox'))
+        box.text = '\n'.join(lines)
+        box.numRows = min(len(lines), MAX_SHOWN_ISSUES + 2)
+
     def updateSelectedIndex(self) -> None:
         """
         Shows or hides the component selection command input based on the current export type.
@@ -279,18 +471,34 @@ class BomDialog(Dialog):
             selectInput.isVisible = True
         else:
             selectInput.isVisible = False
-        futil.log(f'updateSelectedIndex: Index is {self.export_index}')
+        log.debug('updateSelectedIndex: Index is %d', self.export_index)
 
-    def getOccurrences(self, design: adsk.fusion.Design):
+    def updateLiveMode(self, design: adsk.fusion.Design) -> live_bom.LiveBom:
         """
-        Gets a list of occurrences to count for the BOM based on the current export type.
+        Starts or stops keeping counts up to date to match the dialog. Called before every export,
+        whatever is exported.
+
+        Returns: the live table, or `None` if live mode is off
+        """
+        if not self.getLiveMode():
+            live_bom.disable()
+            return None
+        return live_bom.enable(design)
+
+    def getModelParts(self, design: adsk.fusion.Design, live: live_bom.LiveBom = None) -> list:
+        """
+        Counts the parts to include in the BOM based on the current export type.
+
+        live: The table from `updateLiveMode()`, used to count the whole design.
         """
         if self.export_index == 0: #export all
-            return design.rootComponent.allOccurrences
+            if live is not None:
+                return live.parts()
+            return bom.rollup_model_data(design.rootComponent)
         elif self.export_index == 1: #export active
-            return design.activeComponent.allOccurrences
+            return bom.rollup_model_data(design.activeComponent)
         else: #export selected
-            return self.getSelectedComponents()
+            return bom.selection_model_data(self.getSelectedOccurrences())
 
     def getIncludeMaterials(self) -> bool:
         """
@@ -306,9 +514,24 @@ class BomDialog(Dialog):
         button = adsk.core.BoolValueCommandInput.cast(self.inputByShortName('suppliesButton'))
         return button.value
 
-    def getSelectedComponents(self) -> list:
+    def getIncludeMass(self) -> bool:
+        """
+        Returns `True` if CSV and JSON exports will include part masses.
+        """
+        button = adsk.core.BoolValueCommandInput.cast(self.inputByShortName('massButton'))
+        return button.value
+
+    def getLiveMode(self) -> bool:
+        """
+        Returns `True` if part counts are kept up to date between exports.
+        """
+        button = adsk.core.BoolValueCommandInput.cast(self.inputByShortName('liveButton'))
+        return button.value
+
+    def getSelectedOccurrences(self) -> list:
         """
-        Returns the list of currently selected components. Note: this does not check parent/child relationships for parsing purposes.
+        Returns the list of currently selected occurrences. Nested selections are not removed
+        here; `bom.selection_model_data()` collapses them.
         """
         selectInput = adsk.core.SelectionCommandInput.cast(self.inputByShortName('selectionInput'))
         ret = []
@@ -316,6 +539,6 @@ class BomDialog(Dialog):
             return ret
         for i in range(0, selectInput.selectionCount):
             entity = selectInput.selection(i).entity
-            if entity.classType() == adsk.fusion.Occurrence.objectType:
-                ret.append(adsk.fusion.Component.cast(entity))
+            if entity.objectType == adsk.fusion.Occurrence.classType():
+                ret.append(adsk.fusion.Occurrence.cast(entity))
         return ret
\ No newline at end of file
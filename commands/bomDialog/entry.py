@@ -1,53 +1,46 @@
-import adsk.core
+import adsk.core, logging
 from ...lib import fusion360utils as futil
 
 from .dialog import BomDialog
+from . import dialog as bom_dialog, live_bom, pipeline
 
-from ...import config
+from .. import COMMANDS
 
 app = futil.app
 ui = app.userInterface
+log = logging.getLogger(__name__)
 
-CMD_ID = f'{config.ADDIN_PREFIX}_bomDialog'
-CMD_NAME = 'Generate BOM'
-CMD_Description = 'Bill of Materials generator for the Clock 3 project'
-
-COMMAND_BESIDE_ID = ''
-ICON_FOLDER = config.local_icon_folder(__file__)
+# The button is added by `commands.start()`; this module is imported the first time it is clicked
+CMD_ID = COMMANDS['bomDialog'].id
+CMD_NAME = COMMANDS['bomDialog'].name
+ICON_FOLDER = COMMANDS['bomDialog'].icon_folder
 
 local_handlers = []
 dialog = None
 
 def start():
     """
-    Create the dialog command button.
+    Registers the events the dialog needs. Called when the command is first run.
     """
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-    control.isPromoted = True
+    bom_dialog.register_events()
 
 def stop():
     """
-    Destroy the command on exit/unload.
+    Cleans up on exit/unload.
     """
-    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
-    if panel:
-        command_control = panel.controls.itemById(CMD_ID)
-        if command_control:
-            command_definition = ui.commandDefinitions.itemById(CMD_ID)
-            command_control.deleteMe()
-            if command_definition:
-                command_definition.deleteMe()
+    live_bom.disable()
+    bom_dialog.unregister_events()
 
 
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     global dialog, local_handlers
+    if pipeline.is_running():
+        # Otherwise the next export is queued behind it
+        res = ui.messageBox('A bill of materials export is still running. Cancel it?\n\n'
+                            'If not, the next export starts when it finishes.', CMD_NAME,
+                            adsk.core.MessageBoxButtonTypes.YesNoButtonType)
+        if res == adsk.core.DialogResults.DialogYes:
+            pipeline.cancel()
     dialog = BomDialog(args.command, CMD_ID, ICON_FOLDER, local_handlers)
     futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
 
@@ -56,7 +49,7 @@ def command_destroy(args: adsk.core.CommandEventArgs):
     Called when the command ends; clears event handler references.
     """
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    log.debug('%s Command Destroy Event', CMD_NAME)
 
     global local_handlers, dialog
     dialog = None
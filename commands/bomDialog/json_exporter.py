@@ -0,0 +1,56 @@
+#json_exporter.py
+#
+# Writes a bill of materials as JSON for other tools, e.g.
+#
+#   {"parts": [{"ID": "PN001", "Type": "Frame", ..., "Qty": 4, ...}, ...]}
+#
+# Each part has the same fields, in the same order, as a row of the CSV export. With masses, parts
+# also get the `data_parser.MASS_FIELDS` (null if unknown) and the file a `totalMass`, in kg.
+import json
+from typing import OrderedDict
+
+from . import atomic_write
+from .data_parser import EXPORT_FIELDS, MASS_DIGITS, MASS_FIELDS, mass_values
+
+class JsonExportError(Exception):
+    pass
+
+def render_parts(data: OrderedDict, masses: dict = None) -> list:
+    """
+    Converts merged part data into a list of `dict`s with an `ID` field. Parts with a `Qty` of zero
+    are skipped.
+
+    masses: Optional part masses by ID, to add the `MASS_FIELDS`.
+    """
+    fields = EXPORT_FIELDS[1:]
+    if masses is None:
+        return [dict(zip(EXPORT_FIELDS, (part_id,) + tuple(part[field] for field in fields)))
+                for (part_id, part) in data.items() if part['Qty'] != 0]
+    return [dict(zip(EXPORT_FIELDS + MASS_FIELDS, (part_id,) + tuple(part[field] for field in fields)
+                     + mass_values(part_id, part['Qty'], masses)))
+            for (part_id, part) in data.items() if part['Qty'] != 0]
+
+def export_json_bom(filepath: str, data: OrderedDict, masses: dict = None) -> bool:
+    """
+    Exports data for a bill of materials as JSON. The file is replaced atomically, and only if its
+    content changes; see `atomic_write.write_if_changed()`.
+
+    filepath: A string with the full file path and name.
+    data: A dict containing the data to export.
+    masses: Optional part masses, as `mass_cache.part_masses()`, to add mass fields and a `totalMass`.
+
+    Returns: `True` if the file was written, `False` if it already had this content.
+    """
+    def write(path: str) -> None:
+        parts = render_parts(data, masses)
+        content = {'parts': parts}
+        if masses is not None:
+            total = sum(part['TotalMass'] for part in parts if part['TotalMass'] is not None)
+            content['totalMass'] = round(total, MASS_DIGITS)
+        with open(path, 'w', newline='') as outfile:
+            json.dump(content, outfile, indent=1)
+            outfile.write('\n')
+    try:
+        return atomic_write.write_if_changed(filepath, write)
+    except Exception as e:
+        raise JsonExportError('Export failed') from e
@@ -0,0 +1,201 @@
+#lazy_catalog.py
+#
+# Source catalogs that are parsed on demand, for files too large to parse up front. A sidecar index
+# maps each part ID to the byte offset of its row and lists the parts with a default quantity. The
+# index is persisted to `config.CACHE_PATH` and rebuilt when the file's modification time or size
+# changes. Lookups memory-map the file and parse only the requested rows.
+
+import csv, hashlib, locale, mmap, os, pickle, threading
+from array import array
+from typing import Iterator, Mapping
+
+from . import atomic_write, data_parser
+from ... import config
+
+# Bump when the on-disk index layout changes.
+INDEX_VERSION = 2
+INDEX_EXTENSION = '.index'
+
+class CatalogIndex:
+    """
+    Byte offsets of the rows of one source file, keyed and sorted by part ID.
+    """
+    __slots__ = ('path', 'mtime_ns', 'size', 'encoding', 'offsets', 'defaults', 'issues')
+
+    def __init__(self, path: str, mtime_ns: int, size: int, encoding: str, offsets: dict, defaults: tuple,
+                 issues: tuple = ()) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.encoding = encoding
+        self.offsets = offsets
+        self.defaults = defaults
+        self.issues = issues
+
+class LazyCatalog(Mapping):
+    """
+    A read-only source catalog backed by a `CatalogIndex`. Rows are parsed into `PartRecord`s the
+    first time they are looked up and kept for later lookups.
+    """
+    def __init__(self, index: CatalogIndex, include_defaults: bool = True) -> None:
+        self.filepath = index.path
+        self.digest = None
+        self.defaults = index.defaults if include_defaults else ()
+        self.issues = index.issues
+        self._index = index
+        self._include_defaults = include_defaults
+        self._rows = {}
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, part_id: str) -> data_parser.PartRecord:
+        row = self._rows.get(part_id)
+        if row is None:
+            row = self._rows[part_id] = self._parse(self._index.offsets[part_id])
+        return row
+
+    def __contains__(self, part_id: object) -> bool:
+        return part_id in self._index.offsets
+
+    def __iter__(self):
+        return iter(self._index.offsets)
+
+    def __len__(self) -> int:
+        return len(self._index.offsets)
+
+    def close(self) -> None:
+        """
+        Unmaps the file, e.g. so it can be edited on Windows. It is mapped again on the next
+        lookup of a row that has not been parsed yet.
+        """
+        with self._lock:
+            self._unmap()
+
+    def _parse(self, offset: int) -> data_parser.PartRecord:
+        with self._lock:
+            if self._map is None:
+                self._map_file()
+            values = next(csv.reader(_lines(self._map, offset, self._index.encoding), dialect='excel'))
+        return data_parser.parse_row_data(data_parser.row_dict(values), self._include_defaults)
+
+    def _map_file(self) -> None:
+        index = self._index
+        datafile = open(index.path, 'rb')
+        try:
+            stat = os.fstat(datafile.fileno())
+            if stat.st_mtime_ns != index.mtime_ns or stat.st_size != index.size:
+                raise data_parser.ImportError(f'{index.path} changed since it was indexed')
+            self._map = mmap.mmap(datafile.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            datafile.close()
+            raise
+        self._file = datafile
+
+    def _unmap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+def open_catalog(filepath: str, include_defaults: bool = True) -> LazyCatalog:
+    """
+    Opens a source file as a `LazyCatalog`, building its index if there is no up-to-date one.
+
+    filepath: A string with the full file path and name.
+    include_defaults: If `True`, includes default values hard-coded into the .csv.
+    """
+    return LazyCatalog(load_index(filepath), include_defaults)
+
+def load_index(filepath: str) -> CatalogIndex:
+    """
+    Returns the index of a source file, from `config.CACHE_PATH` if it is still valid.
+    """
+    path = os.path.normcase(os.path.abspath(filepath))
+    stat = os.stat(path)
+    encoding = locale.getpreferredencoding(False)
+    index = _read_index(path)
+    if index is not None and index.mtime_ns == stat.st_mtime_ns and index.size == stat.st_size \
+            and index.encoding == encoding:
+        return index
+    index = build_index(path, encoding)
+    _write_index(index)
+    return index
+
+def build_index(path: str, encoding: str) -> CatalogIndex:
+    """
+    Scans a source file once, recording where each row starts, which rows have a default quantity
+    and any problems `data_parser.check_row()` finds. Rows are split with the `csv` module, so
+    quoted fields may contain newlines. As with `data_parser.read_source_data()`, the last row wins
+    if an ID is listed twice.
+    """
+    offsets = {}
+    defaults = set()
+    seen = {}
+    issues = []
+    with open(path, 'rb') as datafile:
+        stat = os.fstat(datafile.fileno())
+        if stat.st_size == 0:
+            return CatalogIndex(path, stat.st_mtime_ns, 0, encoding, {}, ())
+        with mmap.mmap(datafile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # The reader never reads ahead, so after each row `starts` holds the offsets of exactly
+            # the lines that made it up
+            starts = []
+            reader = csv.reader(_lines(buffer, 0, encoding, starts), dialect='excel')
+            for values in reader:
+                start = starts[0]
+                starts.clear()
+                if not values:
+                    continue
+                row = data_parser.row_dict(values)
+                data_parser.check_row(row, reader.line_num, seen, issues)
+                part_id = row['ID']
+                offsets[part_id] = start
+                default = row['DefaultValue']
+                if default is not None and default.isnumeric() and int(default) != 0:
+                    defaults.add(part_id)
+                else:
+                    defaults.discard(part_id)
+    offsets = dict(sorted(offsets.items()))
+    return CatalogIndex(path, stat.st_mtime_ns, stat.st_size, encoding, offsets,
+                        tuple(part_id for part_id in offsets if part_id in defaults), tuple(issues))
+
+def _lines(buffer, offset: int, encoding: str, starts: list = None) -> Iterator[str]:
+    """
+    Yields decoded lines, with their line endings, from `offset` on. If `starts` is given, the
+    offset of each line is appended to it.
+    """
+    end = len(buffer)
+    while offset < end:
+        stop = buffer.find(b'\n', offset)
+        stop = end if stop < 0 else stop + 1
+        if starts is not None:
+            starts.append(offset)
+        yield buffer[offset:stop].decode(encoding)
+        offset = stop
+
+def _index_path(path: str) -> str:
+    name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    return os.path.join(config.CACHE_PATH, name + INDEX_EXTENSION)
+
+def _read_index(path: str) -> CatalogIndex:
+    """
+    Loads a persisted index. Returns `None` if there is no usable one.
+    """
+    try:
+        with open(_index_path(path), 'rb') as indexfile:
+            (version, index_path, mtime_ns, size, encoding, ids, offsets, defaults, issues) = pickle.load(indexfile)
+    except Exception:
+        return None
+    if version != INDEX_VERSION or index_path != path:
+        return None
+    return CatalogIndex(path, mtime_ns, size, encoding, dict(zip(ids, offsets)), defaults, issues)
+
+def _write_index(index: CatalogIndex) -> None:
+    """
+    Stores an index on disk.
+    """
+    data = (INDEX_VERSION, index.path, index.mtime_ns, index.size, index.encoding,
+            tuple(index.offsets), array('Q', index.offsets.values()), index.defaults, index.issues)
+    atomic_write.dump_pickle(_index_path(index.path), data)
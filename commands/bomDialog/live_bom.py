@@ -0,0 +1,191 @@
+#live_bom.py
+#
+# Keeps the part counts for a design up to date between exports. Fusion does not raise events for
+# individual occurrences, so completed commands only mark the table as possibly changed, without
+# touching the design. The changes are picked up when the counts are next needed: the root
+# component's direct occurrences are compared with the ones already counted, and each component's
+# `revisionId` is checked to catch edits inside subassemblies. Anything that cannot be applied
+# incrementally forces a full rebuild.
+
+import adsk.core, adsk.fusion, logging
+from . import bom
+
+log = logging.getLogger(__name__)
+
+class LiveBom:
+    """
+    A running part-count table for one root component.
+    """
+    def __init__(self, root_component) -> None:
+        self.root = root_component
+        self.root_key = bom.component_key(root_component)
+        self.needs_rebuild = True
+        self.needs_sync = False
+        self.rebuild_count = 0
+        self.change_count = 0
+        self._memo = {}
+        self._components = {}
+        self._revisions = {}
+        self._counts = {}
+        self._tracked = {}
+
+    def rebuild(self) -> None:
+        """
+        Recounts the whole design from scratch.
+        """
+        self._memo = {}
+        self._components = {}
+        # The memo owns the root's counts; keep a private copy to update in place
+        self._counts = dict(bom._subtree_counts(self.root, self._memo, self._components))
+        self._revisions = {key: comp.revisionId for (key, comp) in self._components.items()}
+        self._tracked = {occ.entityToken: bom.component_key(occ.component) for occ in self.root.occurrences}
+        self.needs_rebuild = False
+        self.needs_sync = False
+        self.rebuild_count += 1
+
+    def invalidate(self) -> None:
+        self.needs_rebuild = True
+
+    def mark_changed(self) -> None:
+        """
+        Notes that the design may have changed. Nothing is read from the design until `parts()`.
+        """
+        self.needs_sync = True
+
+    def parts(self) -> list:
+        """
+        Returns the current part records, as `bom.extract_model_data()`. Changes since the last
+        call are applied first with `sync()`, or by rebuilding if needed.
+        """
+        if self.needs_sync and not self.needs_rebuild:
+            try:
+                self.sync()
+            except Exception:
+                log.exception('Live BOM sync failed; recounting')
+                self.invalidate()
+        if self.needs_rebuild:
+            self.rebuild()
+        return bom._part_records(self._counts, self._components)
+
+    def occurrence_added(self, occurrence) -> None:
+        """
+        Counts a new occurrence. Only occurrences placed directly in the root component can be
+        applied incrementally; anything else forces a rebuild.
+        """
+        if self.needs_rebuild:
+            return
+        if occurrence.assemblyContext is not None:
+            self.invalidate()
+            return
+        comp = occurrence.component
+        key = bom.component_key(comp)
+        self._track(key, comp)
+        self._tracked[occurrence.entityToken] = key
+        self._apply(key, 1)
+
+    def occurrence_removed(self, token: str) -> None:
+        """
+        Uncounts a removed occurrence by its entity token, since the occurrence itself is gone.
+        """
+        if self.needs_rebuild:
+            return
+        key = self._tracked.pop(token, None)
+        if key is None:
+            self.invalidate()
+            return
+        self._apply(key, -1)
+
+    def occurrence_replaced(self, token: str, occurrence) -> None:
+        """
+        Handles an occurrence whose component was replaced.
+        """
+        self.occurrence_removed(token)
+        self.occurrence_added(occurrence)
+
+    def sync(self) -> None:
+        """
+        Compares the design with the counted state and applies the differences. This reads every
+        tracked component's `revisionId` and the root's occurrences, so it is only done on demand.
+        """
+        self.needs_sync = False
+        if self.needs_rebuild:
+            return
+        for (key, revision) in self._revisions.items():
+            if self._components[key].revisionId != revision:
+                self.invalidate()
+                return
+        current = {}
+        for occ in self.root.occurrences:
+            current[occ.entityToken] = occ
+        for token in [token for token in self._tracked if token not in current]:
+            self.occurrence_removed(token)
+        for (token, occ) in current.items():
+            key = self._tracked.get(token)
+            if key is None:
+                self.occurrence_added(occ)
+            elif key != bom.component_key(occ.component):
+                self.occurrence_replaced(token, occ)
+
+    def _track(self, key: str, comp) -> None:
+        if key not in self._components:
+            self._components[key] = comp
+            self._revisions[key] = comp.revisionId
+        bom._subtree_counts(comp, self._memo, self._components)
+        # Pick up revisions for anything new below the component
+        for sub_key in self._memo[key]:
+            if sub_key not in self._revisions:
+                self._revisions[sub_key] = self._components[sub_key].revisionId
+
+    def _apply(self, key: str, sign: int) -> None:
+        counts = self._counts
+        counts[key] = counts.get(key, 0) + sign
+        for (sub_key, sub_count) in self._memo[key].items():
+            counts[sub_key] = counts.get(sub_key, 0) + sub_count * sign
+        for changed in [key, *self._memo[key]]:
+            if counts[changed] == 0:
+                del counts[changed]
+        self.change_count += 1
+
+# The active live table and its host event handlers, if live mode is enabled
+_live = None
+_handlers = []
+
+def enable(design: adsk.fusion.Design) -> LiveBom:
+    """
+    Starts tracking `design`, or returns the existing table if it already tracks it.
+    """
+    global _live
+    if _live is not None and _live.root_key == bom.component_key(design.rootComponent):
+        return _live
+    from ...lib import fusion360utils as futil
+    disable()
+    _live = LiveBom(design.rootComponent)
+    app = adsk.core.Application.get()
+    _handlers.append((app.userInterface.commandTerminated,
+                      futil.add_handler(app.userInterface.commandTerminated, _command_terminated)))
+    _handlers.append((app.documentActivated,
+                      futil.add_handler(app.documentActivated, _document_activated)))
+    return _live
+
+def disable() -> None:
+    """
+    Stops tracking and releases the host event handlers.
+    """
+    global _live
+    _live = None
+    for (event, handler) in _handlers:
+        event.remove(handler)
+    _handlers.clear()
+
+def current() -> LiveBom:
+    return _live
+
+def _command_terminated(args: adsk.core.ApplicationCommandEventArgs) -> None:
+    # Runs after every command the user completes, so it must not touch the design
+    if _live is not None and args.terminationReason == adsk.core.CommandTerminationReason.CompletedTerminationReason:
+        _live.mark_changed()
+
+def _document_activated(args: adsk.core.DocumentEventArgs) -> None:
+    # Changes made in other documents are not seen; recount when this design is exported again
+    if _live is not None:
+        _live.invalidate()
@@ -1,5 +1,8 @@
 #markdown_exporter.py
-from typing import Iterable, OrderedDict
+from operator import itemgetter
+from typing import Iterable, Iterator, OrderedDict
+
+from . import atomic_write
 
 
 BOM_STRINGS = { 
@@ -42,19 +45,28 @@ class MarkdownExportError(Exception):
     pass
 
 def format_sectioned_table(data : OrderedDict, section_key : str) -> str:
+    """
+    Formats a part list for Markdown as one table per section, e.g. one per part type.
+    """
+    return ''.join(render_sectioned_table(data, section_key))
+
+def render_sectioned_table(data : OrderedDict, section_key : str) -> Iterator[str]:
+    """
+    Yields the chunks of `format_sectioned_table()` without joining them. Rows are grouped in a
+    single pass; sections appear in the order they are first seen and rows are sorted by ID.
+    """
     LINE_FORMAT = '| {id} | {description} | {qty} | {uom} | {notes} |\n'
     LINE_FORMAT_URL = '| {id} | [{description}]({ref_url}) | {qty} | {uom} | {notes} |\n'
 
     #('Type', 'Description', 'UOM', 'Qty', 'RefSupplier', 'RefUrl', 'RefMfgr', 'RefMfgrPN', 'Notes')
-    sections = OrderedDict()
-    for row in data.values():
-        if row[section_key] not in sections:
-            sections[row[section_key]] = []
-
-    keys = list(data.keys())
-    keys.sort()
-    for part_id in keys:
-        part = data[part_id]
+    sections = {}
+    #`import_source_data()` returns sorted data; only sort again if the caller's data is not
+    is_sorted = True
+    last_id = None
+    for (part_id, part) in data.items():
+        if last_id is not None and part_id < last_id:
+            is_sorted = False
+        last_id = part_id
         if part['RefUrl'] is not None and part['RefUrl'] != '':
             formatted = LINE_FORMAT_URL.format(id=part_id, 
                                                description=part['Description'], 
@@ -68,20 +80,30 @@ def format_sectioned_table(data : OrderedDict, section_key : str) -> str:
                                            qty=part['Qty'],
                                            uom=part['UOM'],
                                            notes=part['Notes'])
-        sections[part[section_key]].append(formatted)
-    result = ''
+        section = sections.get(part[section_key])
+        if section is None:
+            section = sections[part[section_key]] = []
+        section.append((part_id, formatted))
+
+    (head, tail) = BOM_STRINGS['section'].split('{table}', 1)
     for (title, section) in sections.items():
-        table = ''
-        for line in section:
-            table += line
-        result += BOM_STRINGS['section'].format(title=title, table=table)
-    return result
-            
+        if not is_sorted:
+            section.sort(key=itemgetter(0))
+        yield head.format(title=title)
+        for (_, line) in section:
+            yield line
+        yield tail.format(title=title)
 
 def format_table(data : OrderedDict, include_id : bool = True) -> str:
     """
     Formats a part list for Markdown
     """
+    return ''.join(render_table(data, include_id))
+
+def render_table(data : OrderedDict, include_id : bool = True) -> Iterator[str]:
+    """
+    Yields the chunks of `format_table()` without joining them.
+    """
     NEW_LINE = '\n|'
     HEADERS = ('Description', 'UOM', 'Qty', 'RefUrl', 'Notes')
     HEADERS_ID = ('ID', 'Description', 'UOM', 'Qty', 'RefUrl', 'Notes')
@@ -92,43 +114,42 @@ def format_table(data : OrderedDict, include_id : bool = True) -> str:
     else:
         headers = HEADERS
 
-    result = '|'
-    
-    #Add the header line
-    for key in headers:
-        result += f' {key} |'
-    result += NEW_LINE
-    #Add the dashes
-    for key in headers:
-        result += '---|'
+    #Add the header line and the dashes
+    yield '|' + ''.join(f' {key} |' for key in headers) + NEW_LINE + '---|' * len(headers)
 
     #part_num is the 'ID' field, the rest we look up with the ID as key
-    for part_num in data.keys():
-        part : OrderedDict = data[part_num]
-        result += NEW_LINE
+    for (part_num, part) in data.items():
         # only include the part number if requested
         if include_id:
-            result += f' {part_num} |'
-        for key in headers:
-            result += f' {part[key]} |'
-    result += '\n'
-    return result
+            yield f'{NEW_LINE} {part_num} |'
+        else:
+            yield NEW_LINE
+        yield ''.join([f' {part[key]} |' for key in headers])
+    yield '\n'
         
-def export_markdown_bom(filepath : str, data: OrderedDict, section_key : str = '', include_id=True):
+def export_markdown_bom(filepath : str, data: OrderedDict, section_key : str = '', include_id=True) -> bool:
+    """
+    Exports data for a bill of materials as Markdown. The file is replaced atomically, and only if
+    its content changes; see `atomic_write.write_if_changed()`.
+
+    Returns: `True` if the file was written, `False` if it already had this content.
+    """
     try:
         #Adding a prefix? Just modify the constant
-        out : str = BOM_STRINGS['prefix']
+        out = [BOM_STRINGS['prefix']]
         
         #If requested, split into sections for simplified Markdown display
         if section_key != '':
-            out += format_sectioned_table(data, section_key=section_key)
+            out.extend(render_sectioned_table(data, section_key=section_key))
         else:
-            out += format_table(data, include_id=True)
+            out.extend(render_table(data, include_id=True))
         
         #Adding a suffix? Just modify the constant.
-        out += BOM_STRINGS['suffix']
+        out.append(BOM_STRINGS['suffix'])
 
-        with open(filepath, 'w', newline='') as outfile:
-            outfile.write(out)
+        def write(path: str) -> None:
+            with open(path, 'w', newline='') as outfile:
+                outfile.writelines(out)
+        return atomic_write.write_if_changed(filepath, write)
     except Exception as e:
         raise MarkdownExportError('Export failed')
\ No newline at end of file
@@ -0,0 +1,108 @@
+#mass_cache.py
+#
+# Part masses for the BOM's optional mass columns. Physical properties are computed by Fusion on
+# request and are slow, so each component is queried once and the result memoized, in memory and
+# in `config.CACHE_PATH`, keyed on the component and its `revisionId`. The revision changes
+# whenever the component is modified, so an unchanged design is never queried again, even in a
+# later session. The API has no call to compute the properties of several components at once.
+#
+# Masses are in kilograms, as Fusion reports them.
+
+import os, pickle, threading
+
+from . import atomic_write, bom
+from ... import config
+
+# Bump when the on-disk layout changes.
+CACHE_VERSION = 1
+CACHE_FILENAME = 'masses.cache'
+
+# Entries kept on disk; the oldest are dropped first. Every revision of a component is a new entry.
+MAX_ENTRIES = 100000
+
+_masses = None
+_dirty = False
+_lock = threading.Lock()
+
+def component_mass(comp) -> float:
+    """
+    Returns the mass of one instance of a component, including everything in it, querying Fusion
+    only if this revision of it has not been seen before.
+    """
+    global _dirty
+    key = (bom.component_key(comp), comp.revisionId)
+    with _lock:
+        masses = _load()
+        mass = masses.get(key)
+        if mass is None:
+            mass = masses[key] = comp.physicalProperties.mass
+            _dirty = True
+    return mass
+
+def part_masses(model_parts: list) -> dict:
+    """
+    Returns the mass of one of each part, by part ID. If several components share a part ID, their
+    masses are averaged by count, so unit mass times quantity is the exact total. The cache is
+    saved if anything new was queried.
+
+    model_parts: Records with a `component`, e.g. from `bom.rollup_model_data()`. Records without
+        one, such as snapshot records, are skipped.
+
+    Returns: a `dict` of part ID to mass in kilograms
+    """
+    totals = {}
+    counts = {}
+    for record in model_parts:
+        comp = record.get('component')
+        if comp is None or record['count'] == 0:
+            continue
+        part_id = record['ID']
+        totals[part_id] = totals.get(part_id, 0.0) + component_mass(comp) * record['count']
+        counts[part_id] = counts.get(part_id, 0) + record['count']
+    save()
+    return {part_id: total / counts[part_id] for (part_id, total) in totals.items()}
+
+def save() -> None:
+    """
+    Writes the cache to disk if anything was added.
+    """
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        _dirty = False
+        entries = list(_masses.items())[-MAX_ENTRIES:]
+    atomic_write.dump_pickle(os.path.join(config.CACHE_PATH, CACHE_FILENAME), (CACHE_VERSION, entries))
+
+def clear(disk: bool = True) -> None:
+    """
+    Forgets every cached mass.
+
+    disk: If `False`, only the in-memory cache is cleared; it is read from disk again on next use.
+    """
+    global _masses, _dirty
+    with _lock:
+        _masses = None
+        _dirty = False
+        if not disk:
+            return
+        try:
+            os.remove(os.path.join(config.CACHE_PATH, CACHE_FILENAME))
+        except OSError:
+            pass
+
+def _load() -> dict:
+    """
+    Returns the in-memory cache, reading it from disk on first use. Call with `_lock` held.
+    """
+    global _masses
+    if _masses is None:
+        _masses = {}
+        try:
+            with open(os.path.join(config.CACHE_PATH, CACHE_FILENAME), 'rb') as cachefile:
+                (version, entries) = pickle.load(cachefile)
+            if version == CACHE_VERSION:
+                _masses = dict(entries)
+        except Exception:
+            pass
+    return _masses
@@ -0,0 +1,218 @@
+#pipeline.py
+#
+# The part of an export that does not need Fusion: reading the source file, merging it with the
+# model's part counts and writing the output. Jobs run on a worker thread so the UI stays
+# responsive; the model traversal has to happen on the main thread before a job is created.
+
+import os, threading, traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from . import atomic_write, bom, catalog_cache, data_parser, json_exporter, markdown_exporter, snapshot
+from ... import config, tracing
+
+# Export formats, in the order of the dialog's format drop down
+FORMAT_CSV = 0
+FORMAT_MARKDOWN = 1
+FORMAT_SNAPSHOT = 2
+FORMAT_JSON = 3
+FORMAT_NAMES = ('csv', 'markdown', 'snapshot', 'json')
+
+# Result statuses passed to the completion callback
+STATUS_DONE = 'done'
+STATUS_PROBLEMS = 'problems'
+STATUS_CANCELLED = 'cancelled'
+STATUS_ERROR = 'error'
+
+class ExportCancelled(Exception):
+    pass
+
+class ExportJob:
+    """
+    One export request. Only plain data is kept, so the job is safe to run off the main thread.
+    `source_paths` lists the source files in lookup order; see `catalog_cache.LayeredCatalog`.
+    `exports` lists (format, destination path) pairs; every format is written from the same merge.
+    `masses` are optional part masses from `mass_cache.part_masses()`, which has to run on the main
+    thread; if given, CSV and JSON exports get mass columns.
+    """
+    def __init__(self,
+                 model_parts: list,
+                 source_paths: list,
+                 exports: list,
+                 include_materials: bool = True,
+                 include_supplies: bool = True,
+                 structure: list = None,
+                 tracer: tracing.Tracer = tracing.DISABLED,
+                 masses: dict = None) -> None:
+        # Drop the component proxies; Fusion objects must not be used from a worker thread
+        self.model_parts = [{'ID': part['ID'], 'name': part['name'], 'count': part['count']} for part in model_parts]
+        self.source_paths = list(source_paths)
+        self.exports = list(exports)
+        self.include_materials = include_materials
+        self.include_supplies = include_supplies
+        self.structure = structure
+        self.tracer = tracer
+        self.masses = masses
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """
+        Raises `ExportCancelled` if the job was cancelled. Called between stages.
+        """
+        if self._cancelled.is_set():
+            raise ExportCancelled()
+
+    def run(self) -> dict:
+        """
+        Runs every stage of the export. The output files are written in parallel, each on its own
+        thread; the other stages run on the calling thread.
+
+        Returns: a `dict` with a `status` and, depending on it, `problems` and the `searched` source
+        files, `message` or the `written` paths and whether each was `updated`
+        """
+        tracer = self.tracer
+        self.check()
+        parts = None
+        if any(export_format != FORMAT_SNAPSHOT for (export_format, _) in self.exports):
+            with tracer.stage('parse source'):
+                catalog = catalog_cache.load_catalogs(self.source_paths, True)
+            self.check()
+            model_parts = self.model_parts
+            if self.structure is not None:
+                # Records that keep the structure include every component, not just parts
+                model_parts = [part for part in model_parts if part['ID'].startswith(config.PART_PREFIX)]
+            with tracer.stage('merge'):
+                try:
+                    (parts, problems) = bom.merge_source_data(
+                            model_parts,
+                            catalog,
+                            self.include_materials,
+                            self.include_supplies)
+                finally:
+                    # Large sources are memory-mapped; release them so the files can be edited
+                    catalog.close()
+
+            if len(problems):
+                return {'status': STATUS_PROBLEMS, 'problems': problems, 'searched': catalog.layer_names()}
+        self.check()
+        with ThreadPoolExecutor(max_workers=len(self.exports), thread_name_prefix='bomWrite') as writers:
+            futures = [writers.submit(self.write, export_format, dest_path, parts)
+                       for (export_format, dest_path) in self.exports]
+        return {'status': STATUS_DONE,
+                'written': [dest_path for (_, dest_path) in self.exports],
+                'updated': [future.result() for future in futures]}
+
+    def write(self, export_format: int, dest_path: str, parts: dict) -> bool:
+        """
+        Writes one output file. Every format is replaced atomically, and only if its content
+        changes.
+
+        parts: The merged part data; unused for snapshots.
+
+        Returns: `True` if the file was written, `False` if it already had this content
+        """
+        with self.tracer.stage(f'write {FORMAT_NAMES[export_format]}'):
+            if export_format == FORMAT_CSV:
+                return data_parser.export_csv_bom(dest_path, parts, self.masses)
+            elif export_format == FORMAT_MARKDOWN:
+                return markdown_exporter.export_markdown_bom(dest_path, parts, section_key='Type', include_id=False)
+            elif export_format == FORMAT_JSON:
+                return json_exporter.export_json_bom(dest_path, parts, self.masses)
+            name = os.path.splitext(os.path.basename(dest_path))[0]
+            return atomic_write.write_if_changed(
+                    dest_path, lambda path: snapshot.save_snapshot(path, self.model_parts, name, self.structure))
+
+_executor = None
+# Jobs queued or running, oldest first
+_jobs = []
+_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Call with `_lock` held
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bomExport')
+    return _executor
+
+def submit(job: ExportJob, notify: Callable[[dict], None]) -> Future:
+    """
+    Queues a job on the worker thread. Jobs run one at a time, in the order they were submitted;
+    call `cancel()` first to drop earlier ones. `notify` is called from the worker thread with the
+    job's result, or with an error or cancelled status.
+    """
+    def work():
+        try:
+            result = job.run()
+        except ExportCancelled:
+            result = {'status': STATUS_CANCELLED}
+        except Exception:
+            result = {'status': STATUS_ERROR, 'message': traceback.format_exc()}
+        # Logging has to happen on the main thread, so the summary travels with the result
+        result['trace'] = job.tracer.finish(log=False)
+        with _lock:
+            _jobs.remove(job)
+        notify(result)
+        return result
+
+    with _lock:
+        _jobs.append(job)
+        return _get_executor().submit(work)
+
+def prefetch(source_paths: list, notify: Callable[[dict], None]) -> Future:
+    """
+    Loads and checks source files on the worker thread, so a later export finds them in
+    `catalog_cache`. Does not cancel a running export; the files are loaded after it.
+
+    `notify` is called from the worker thread with a `dict` holding the `sources` and a `status`.
+    On success it also holds the `issues` found and the number of `parts` per file; on failure, a
+    `message`.
+    """
+    source_paths = list(source_paths)
+    def work():
+        result = {'sources': source_paths}
+        try:
+            catalog = catalog_cache.load_catalogs(source_paths, True)
+            result.update(status=STATUS_DONE, issues=list(catalog.issues), parts=[len(layer) for layer in catalog.layers])
+        except Exception as e:
+            result.update(status=STATUS_ERROR, message=str(e.__cause__ or e))
+        notify(result)
+        return result
+
+    with _lock:
+        return _get_executor().submit(work)
+
+def is_running() -> bool:
+    """
+    Returns `True` if a job is queued or running.
+    """
+    with _lock:
+        return len(_jobs) > 0
+
+def cancel() -> None:
+    """
+    Cancels every queued or running job. A running job stops at the next stage boundary; queued
+    jobs stop before they start.
+    """
+    with _lock:
+        for job in _jobs:
+            job.cancel()
+
+def shutdown() -> None:
+    """
+    Cancels any running job and stops the worker thread.
+    """
+    global _executor
+    with _lock:
+        for job in _jobs:
+            job.cancel()
+        executor = _executor
+        _executor = None
+    if executor is not None:
+        executor.shutdown(wait=False)
@@ -0,0 +1,231 @@
+#snapshot.py
+#
+# Occurrence snapshots: the part data extracted from a model, saved so the rest of the BOM
+# pipeline can run later without Fusion (see `batch.py`). Two formats are supported.
+#
+# JSON (.json), mostly for hand-written or generated test data:
+#
+#   {"version": 1, "name": "Clock 3", "parts": [{"ID": "PN001", "name": "...", "count": 4}, ...],
+#    "structure": [[-1, 0, 2], ...]}
+#
+# Binary (anything else, typically .c3snap), little-endian:
+#
+#   header      '<4sHHIIIII': magic, version, flags, name string, string count, record count,
+#               edge count, string data size
+#   offsets     uint32 * (string count + 1), start of each string in the string data
+#   strings     UTF-8 string data, padded to 4 bytes
+#   records     uint32 * 3 per record: ID string, description string, count
+#   edges       uint32 * 3 per edge: parent record (0xFFFFFFFF for the root), child record, uses
+#
+# Strings are interned, so repeated descriptions are stored once. Binary snapshots are read through
+# a memory map; only the records that are accessed are decoded.
+
+import json, mmap, os, struct, sys
+from array import array
+
+from ... import config
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b'C3SN'
+HEADER = struct.Struct('<4sHHIIIII')
+FLAG_STRUCTURE = 0x1
+ROOT_INDEX = 0xFFFFFFFF
+
+class SnapshotError(Exception):
+    pass
+
+def save_snapshot(filepath: str, model_parts: list, name: str = '', structure: list = None) -> None:
+    """
+    Saves part data from a model. Files ending in `.json` are written as JSON, anything else in
+    the binary format.
+
+    filepath: A string with the full file path and name.
+    model_parts: A list of `dict`s with `ID`, `name` and `count` keys, e.g. from `bom.extract_model_data()`.
+    name: A label for the snapshot, e.g. the design name. Defaults to the file name.
+    structure: Optional (parent index, child index, uses) tuples from `bom.model_structure()`.
+    """
+    if name == '':
+        name = os.path.splitext(os.path.basename(filepath))[0]
+    try:
+        if filepath.endswith('.json'):
+            _save_json(filepath, model_parts, name, structure)
+        else:
+            _save_binary(filepath, model_parts, name, structure)
+    except Exception as e:
+        raise SnapshotError('Failed to save snapshot') from e
+
+def load_snapshot(filepath: str) -> dict:
+    """
+    Loads a snapshot saved with `save_snapshot()`, in either format.
+
+    Returns: a `dict` with the snapshot `name`, its `parts` (`dict`s with `ID`, `name` and `count`
+    keys) and its `structure` (`None` if not saved). Without a structure, `parts` is limited to part
+    numbers. With one, it has every record, since the structure's edges index into them.
+    """
+    try:
+        with open(filepath, 'rb') as infile:
+            is_binary = infile.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    except Exception as e:
+        raise SnapshotError(f'Failed to load snapshot {filepath}') from e
+    if is_binary:
+        with BinarySnapshot(filepath) as snap:
+            parts = snap.records() if snap.has_structure else snap.parts()
+            return {'name': snap.name, 'parts': parts, 'structure': snap.structure()}
+
+    try:
+        with open(filepath, 'r') as infile:
+            data = json.load(infile)
+    except Exception as e:
+        raise SnapshotError(f'Failed to load snapshot {filepath}') from e
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f'Unsupported snapshot version in {filepath}')
+    data.setdefault('structure', None)
+    if data['structure'] is None:
+        data['parts'] = [part for part in data['parts'] if part['ID'].startswith(config.PART_PREFIX)]
+    return data
+
+class BinarySnapshot:
+    """
+    Read-only, memory-mapped access to a binary snapshot. Use as a context manager, or call
+    `close()` when done.
+    """
+    def __init__(self, filepath: str) -> None:
+        try:
+            self._file = open(filepath, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, flags, name_index, string_count, record_count, edge_count, string_size) = \
+                HEADER.unpack_from(self._map, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise SnapshotError(f'Unsupported snapshot version in {filepath}')
+            view = memoryview(self._map)
+            pos = HEADER.size
+            self._offsets = _uint32_view(view, pos, string_count + 1)
+            pos += 4 * (string_count + 1)
+            self._strings = view[pos:pos + string_size]
+            pos += _padded(string_size)
+            self._records = _uint32_view(view, pos, 3 * record_count)
+            pos += 4 * 3 * record_count
+            self._edges = _uint32_view(view, pos, 3 * edge_count)
+            self.has_structure = bool(flags & FLAG_STRUCTURE)
+            self.name = self.string(name_index)
+        except SnapshotError:
+            self.close()
+            raise
+        except Exception as e:
+            self.close()
+            raise SnapshotError(f'Failed to load snapshot {filepath}') from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._records) // 3
+
+    def close(self) -> None:
+        # Views into the map have to be released before it can be closed
+        for attr in ('_offsets', '_strings', '_records', '_edges'):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+    def string(self, index: int) -> str:
+        return str(self._strings[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def record(self, index: int) -> dict:
+        base = 3 * index
+        return {
+            'ID': self.string(self._records[base]),
+            'name': self.string(self._records[base + 1]),
+            'count': self._records[base + 2]
+        }
+
+    def records(self) -> list:
+        """
+        Returns every record, in the order the structure's edges index them.
+        """
+        return [self.record(index) for index in range(len(self))]
+
+    def parts(self) -> list:
+        """
+        Returns the records with a part number, as `bom.extract_model_data()` without components.
+        """
+        prefix = config.PART_PREFIX.encode('utf-8')
+        ret = []
+        records = self._records
+        for base in range(0, len(records), 3):
+            id_index = records[base]
+            if bytes(self._strings[self._offsets[id_index]:self._offsets[id_index] + len(prefix)]) == prefix:
+                ret.append(self.record(base // 3))
+        return ret
+
+    def structure(self) -> list:
+        """
+        Returns the (parent index, child index, uses) edges, or `None` if none were saved.
+        """
+        if not self.has_structure:
+            return None
+        edges = self._edges
+        return [(-1 if edges[i] == ROOT_INDEX else edges[i], edges[i + 1], edges[i + 2])
+                for i in range(0, len(edges), 3)]
+
+def _padded(size: int) -> int:
+    return (size + 3) & ~3
+
+def _uint32_view(view: memoryview, start: int, count: int) -> memoryview:
+    # The format is little-endian; Fusion only runs on little-endian platforms
+    return view[start:start + 4 * count].cast('I')
+
+def _save_json(filepath: str, model_parts: list, name: str, structure: list) -> None:
+    parts = [{'ID': part['ID'], 'name': part['name'], 'count': part['count']} for part in model_parts]
+    data = {'version': SNAPSHOT_VERSION, 'name': name, 'parts': parts}
+    if structure is not None:
+        data['structure'] = [list(edge) for edge in structure]
+    with open(filepath, 'w', newline='') as outfile:
+        json.dump(data, outfile, indent=1)
+
+def _save_binary(filepath: str, model_parts: list, name: str, structure: list) -> None:
+    strings = {}
+    def intern(text: str) -> int:
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    name_index = intern(name)
+    records = array('I')
+    for part in model_parts:
+        records.extend((intern(part['ID']), intern(part['name']), part['count']))
+    edges = array('I')
+    for (parent, child, uses) in structure or ():
+        edges.extend((ROOT_INDEX if parent < 0 else parent, child, uses))
+
+    offsets = array('I', [0])
+    encoded = []
+    for text in strings:
+        data = text.encode('utf-8')
+        encoded.append(data)
+        offsets.append(offsets[-1] + len(data))
+    string_data = b''.join(encoded)
+    string_size = len(string_data)
+    string_data += b'\0' * (_padded(len(string_data)) - len(string_data))
+    for block in (offsets, records, edges):
+        if sys.byteorder != 'little':
+            block.byteswap()
+
+    flags = FLAG_STRUCTURE if structure is not None else 0
+    with open(filepath, 'wb') as outfile:
+        outfile.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, name_index,
+                                  len(strings), len(model_parts), len(edges) // 3, string_size))
+        offsets.tofile(outfile)
+        outfile.write(string_data)
+        records.tofile(outfile)
+        edges.tofile(outfile)
@@ -1,8 +1,11 @@
 #display.py
 
+import logging
 import adsk.core
 import adsk.fusion
-from ...lib import fusion360utils as futil
+from ... import tracing
+
+log = logging.getLogger(__name__)
 
 def get_all_occurrences() -> adsk.fusion.OccurrenceList:
     app = adsk.core.Application.get()
@@ -15,33 +18,48 @@ def get_all_occurrences() -> adsk.fusion.OccurrenceList:
     return design.rootComponent.allOccurrences
 
 
-def show_tee_nut_view() -> None:
-    futil.log('show_tee_nut_view()_ called')
-    items = get_all_occurrences()
-    for item in items:
-        comp = item.component
-        pn: str = comp.partNumber
-        if pn.startswith(('PN72', 'PN73', 'PN74', 'PN75', 'PN575')):
-            item.isLightBulbOn = True
-        elif pn.startswith('PN'):
-            item.isLightBulbOn = False
-        else:
-            item.isLightBulbOn = True
-
-def show_frame_view() -> None:
-    futil.log('show_frame_view()_ called')
-    items = get_all_occurrences()
-    for item in items:
-        comp = item.component
-        pn: str = comp.partNumber
-        if pn.startswith(('PN72', 'PN73', 'PN74', 'PN75', 'PN70', 'PN710')):
-            item.isLightBulbOn = True
-        elif pn.startswith('PN'):
-            item.isLightBulbOn = False
-        else:
-            item.isLightBulbOn = True
-
-def show_all():
-    futil.log('show_all()_ called')
-    for item in get_all_occurrences():
-        item.isLightBulbOn = True
\ No newline at end of file
+def apply_visibility(items, is_visible) -> tuple:
+    """
+    Shows or hides each occurrence, only writing `isLightBulbOn` for occurrences whose state
+    actually changes. Each write is a round trip to Fusion and may trigger a redraw.
+
+    items: Any iterable of occurrences, typically an `OccurrenceList`.
+    is_visible: A callable taking an occurrence and returning its target visibility.
+
+    Returns: a `tuple` of (writes made, writes skipped)
+    """
+    return set_visibility((item, is_visible(item)) for item in items)
+
+def set_visibility(targets) -> tuple:
+    """
+    Like `apply_visibility()`, for target states that are already known.
+
+    targets: Any iterable of (occurrence, target visibility) pairs.
+
+    Returns: a `tuple` of (writes made, writes skipped)
+    """
+    written = 0
+    skipped = 0
+    for (item, target) in targets:
+        if item.isLightBulbOn == target:
+            skipped += 1
+            continue
+        item.isLightBulbOn = target
+        written += 1
+    return (written, skipped)
+
+def show_view(view, tracer: tracing.Tracer = tracing.DISABLED) -> int:
+    """
+    Applies a `views.View` to every occurrence in the design.
+
+    tracer: Optional `tracing.Tracer` to record the stages in.
+
+    Returns: the number of writes skipped because the occurrence was already in the right state
+    """
+    log.debug('show_view(%s) called', view.name)
+    with tracer.stage('get occurrences'):
+        items = get_all_occurrences()
+    with tracer.stage('apply visibility'):
+        (written, skipped) = apply_visibility(items, view.is_visible)
+    log.info('%s: %d changed, %d writes skipped', view.name, written, skipped)
+    return skipped
@@ -1,76 +1,73 @@
-import traceback
+import logging, traceback
 import adsk.core, adsk.fusion
 from ...lib import fusion360utils as futil
-from ... import config
-from . import display
+from ... import logger, tracing
+from .. import COMMANDS
+from . import display, snapshots, views
 
 app = adsk.core.Application.get()
 ui = app.userInterface
+log = logging.getLogger(__name__)
 
-CMD_ID = f'clk3_frameHelperDialog'
-CMD_NAME = 'Frame Tools'
-CMD_Description = 'Displays the frame and roll in tee nuts to help documentation'
-
-COMMAND_BESIDE_ID = 'clk3_bomDialog'
-
-ICON_FOLDER = config.local_icon_folder(__file__)
+# The button is added by `commands.start()`; this module is imported the first time it is clicked
+CMD_ID = COMMANDS['frameHelper'].id
+CMD_NAME = COMMANDS['frameHelper'].name
 
 # Local list of event handlers used prevent garbage collection.
 local_handlers = []
 
+# Views listed in the dialog, loaded on first use from `views.VIEWS_FILE`
+view_list = None
+
+# Names of the active design's visibility snapshots, listed in the dialog after the views
+snapshot_names = []
+
 def format_command_name(name: str) -> str:
     return '{}_{}'.format(CMD_ID, name)
 
 def start():
     """
-    Creates the dialog command button.
+    Called when the command is first run; there is nothing to set up.
     """
-
-    # Create a new command definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Add an event handler to be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # Add the command to the UI.
-    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command can be promoted to the main toolbar. 
-    control.isPromoted = True
+    pass
 
 
 def stop():
     """
-    Destroy the command on exit/unload.
-    """
-    # Get the UI elements for this command
-    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
-    if panel:
-        command_control = panel.controls.itemById(CMD_ID)
-        if command_control:
-            command_definition = ui.commandDefinitions.itemById(CMD_ID)
-            command_control.deleteMe()
-            if command_definition:
-                command_definition.deleteMe()
-    
+    Cleans up on exit/unload.
+    """
+    pass
+
 
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     """
     Define the contents of the dialog when invoked.
     """
-    futil.log(f'{CMD_NAME} Command Created Event')
+    log.debug('%s Command Created Event', CMD_NAME)
+
+    global view_list, snapshot_names
+    if view_list is None:
+        view_list = views.load_views()
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    snapshot_names = snapshots.names(design) if design else []
 
     # Get a reference to the command inputs
     inputs = args.command.commandInputs
 
     buttonGroup = inputs.addRadioButtonGroupCommandInput(format_command_name('radioButtonGroup'))
     items = buttonGroup.listItems
-    items.add('Show All', True)
-    items.add('Frame View', False)
-    items.add('Tee Nut View', False)
+    for (index, view) in enumerate(view_list):
+        items.add(view.name, index == 0)
+    for name in snapshot_names:
+        items.add(f'Snapshot: {name}', False)
+
+    saveBox = inputs.addBoolValueInput(format_command_name('saveBox'), 'Save current visibility', True, '', False)
+    saveBox.tooltip = 'Saves the visibility of every occurrence in the design as a snapshot instead of applying a view.'
+    nameBox = inputs.addStringValueInput(format_command_name('snapshotName'), 'Snapshot name', '')
+    nameBox.tooltip = 'A snapshot with the same name is replaced.'
+    deleteBox = inputs.addBoolValueInput(format_command_name('deleteBox'), 'Delete selected snapshot', True, '', False)
+    deleteBox.tooltip = 'Removes the selected snapshot from the design instead of restoring it.'
+    deleteBox.isVisible = len(snapshot_names) > 0
     
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
@@ -90,7 +87,7 @@ def command_execute(args: adsk.core.CommandEventArgs):
 
     try:
         # General logging for debug.
-        futil.log(f'{CMD_NAME} Command Execute Event')
+        log.debug('%s Command Execute Event', CMD_NAME)
 
         # Get a reference to your command's inputs.
         inputs = args.command.commandInputs
@@ -98,17 +95,71 @@ def command_execute(args: adsk.core.CommandEventArgs):
         buttonGroup = inputs.itemById(format_command_name('radioButtonGroup'))
         item : adsk.core.ListItem = buttonGroup.selectedItem
 
-        if item:
-            if item.index == 0: # Show All
-                display.show_all()
-            elif item.index == 1: # Show Frame and brackets
-                display.show_frame_view()
-            elif item.index == 2: # Show Tee Nuts and frame
-                display.show_tee_nut_view()
+        if inputs.itemById(format_command_name('saveBox')).value:
+            save_snapshot(inputs.itemById(format_command_name('snapshotName')).value.strip())
+        elif inputs.itemById(format_command_name('deleteBox')).value:
+            delete_snapshot(snapshot_names[item.index - len(view_list)])
+        elif item and item.index < len(view_list):
+            tracer = tracing.start('frameView')
+            display.show_view(view_list[item.index], tracer)
+            tracer.finish()
+        elif item:
+            show_snapshot(snapshot_names[item.index - len(view_list)])
         else:
-            futil.log(f'Invalid or no index selected', adsk.core.LogLevels.WarningLogLevel)
+            log.warning('Invalid or no index selected')
     except Exception as exc:
-        futil.log('Fatal: {}'.format(traceback.format_exc()))
+        log.exception('Failed to show view')
+        futil.log('Fatal: {}\nRecent log records:\n{}'.format(traceback.format_exc(), logger.dump()))
+
+def save_snapshot(name: str) -> None:
+    """
+    Saves the visibility of every occurrence in the active design as a snapshot.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    items = display.get_all_occurrences()
+    if not design or items is None:
+        return
+    tracer = tracing.start('frameSnapshot')
+    with tracer.stage('capture'):
+        snapshot = snapshots.capture(name, items)
+    with tracer.stage('save'):
+        snapshots.save(design, snapshot)
+    tracer.finish()
+    log.info('Saved snapshot %s of %d occurrences', name, len(snapshot.paths))
+
+def show_snapshot(name: str) -> None:
+    """
+    Restores a snapshot saved with `save_snapshot()`, writing only occurrences that differ.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    items = display.get_all_occurrences()
+    if not design or items is None:
+        return
+    tracer = tracing.start('frameSnapshot')
+    try:
+        with tracer.stage('load'):
+            snapshot = snapshots.load(design, name)
+    except snapshots.SnapshotError as e:
+        tracer.finish()
+        ui.messageBox(str(e), CMD_NAME)
+        return
+    with tracer.stage('restore'):
+        (written, skipped, unknown) = snapshots.restore(snapshot, items)
+    tracer.finish()
+    log.info('%s: %d changed, %d writes skipped, %d not in snapshot', name, written, skipped, unknown)
+
+def delete_snapshot(name: str) -> None:
+    """
+    Removes a snapshot saved with `save_snapshot()` from the active design.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    if not design:
+        return
+    if snapshots.delete(design, name):
+        log.info('Deleted snapshot %s', name)
+    else:
+        log.warning('No snapshot named %s to delete', name)
+
     # def command_preview(args: adsk.core.CommandEventArgs):
 #     """
 #     Called when the command needs to compute a new preview in the graphics window.
@@ -140,7 +191,13 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # This controls if the OK button is enabled or not.
     buttonGroup = inputs.itemById(format_command_name('radioButtonGroup'))
     item = buttonGroup.selectedItem
-    if item:
+    if inputs.itemById(format_command_name('saveBox')).value:
+         # A snapshot needs a name, but no selection
+         inputs.areInputsValid = inputs.itemById(format_command_name('snapshotName')).value.strip() != ''
+    elif inputs.itemById(format_command_name('deleteBox')).value:
+         # Only a snapshot can be deleted, not a view
+         inputs.areInputsValid = item is not None and item.index >= len(view_list)
+    elif item:
          inputs.areInputsValid = True
     else:
          inputs.areInputsValid = False
@@ -0,0 +1,154 @@
+#snapshots.py
+#
+# Named visibility snapshots for Frame Tools. A snapshot records `isLightBulbOn` for every
+# occurrence in the design as a bitset, alongside a token table of the occurrences' full path names
+# (e.g. 'Frame:1+Extrusion:3') that gives each bit its occurrence. Snapshots are stored in the
+# design's attributes, so they are saved and shared with the design:
+#
+#   attribute group ATTRIBUTE_GROUP, name = snapshot name,
+#   value = base64(zlib(JSON {"version": 1, "paths": [...], "bits": base64(bitset)}))
+#
+# Bit i of the bitset is bit (i % 8) of byte (i // 8).
+
+import base64, json, zlib
+
+from . import display
+from ... import config
+
+SNAPSHOT_VERSION = 1
+ATTRIBUTE_GROUP = f'{config.ADDIN_PREFIX}_visibilitySnapshots'
+
+class SnapshotError(Exception):
+    pass
+
+class Snapshot:
+    """
+    The visibility of each occurrence in a design, by full path name.
+    """
+    __slots__ = ('name', 'paths', 'bits')
+
+    def __init__(self, name: str, paths: list, bits: bytes) -> None:
+        self.name = name
+        self.paths = paths
+        self.bits = bits
+
+    def states(self) -> str:
+        """
+        Returns a string with a '1' or '0' per path, in the order of `paths`.
+        """
+        return unpack_bits(self.bits, len(self.paths))
+
+def pack_bits(states: list) -> bytes:
+    """
+    Packs a sequence of `bool`s into a bitset, eight to a byte.
+    """
+    count = len(states)
+    if count == 0:
+        return b''
+    # int() parses the whole string in C, which is much faster than setting bits one at a time
+    text = ''.join(['1' if state else '0' for state in reversed(states)])
+    return int(text, 2).to_bytes((count + 7) // 8, 'little')
+
+def unpack_bits(bits: bytes, count: int) -> str:
+    """
+    Returns the first `count` bits of a bitset from `pack_bits()` as a string of '1's and '0's.
+    """
+    if count == 0:
+        return ''
+    return format(int.from_bytes(bits, 'little'), 'b').zfill(count)[::-1][:count]
+
+def capture(name: str, occurrences) -> Snapshot:
+    """
+    Records the current visibility of `occurrences`, typically `rootComponent.allOccurrences`.
+    """
+    paths = []
+    states = []
+    for occurrence in occurrences:
+        paths.append(occurrence.fullPathName)
+        states.append(occurrence.isLightBulbOn)
+    return Snapshot(name, paths, pack_bits(states))
+
+def restore(snapshot: Snapshot, occurrences) -> tuple:
+    """
+    Applies a snapshot with `display.set_visibility()`, so only occurrences whose visibility
+    differs are written. Occurrences added since the snapshot was taken are left as they are.
+
+    Returns: a `tuple` of (writes made, writes skipped, occurrences not in the snapshot)
+    """
+    items = list(occurrences)
+    paths = [item.fullPathName for item in items]
+    states = snapshot.states()
+    if paths == snapshot.paths:
+        # The design has not changed since the snapshot: bits line up with occurrences
+        targets = [state == '1' for state in states]
+        unknown = 0
+    else:
+        by_path = dict(zip(snapshot.paths, states))
+        known = []
+        targets = []
+        for (item, path) in zip(items, paths):
+            state = by_path.get(path)
+            if state is not None:
+                known.append(item)
+                targets.append(state == '1')
+        unknown = len(items) - len(known)
+        items = known
+    (written, skipped) = display.set_visibility(zip(items, targets))
+    return (written, skipped, unknown)
+
+def encode(snapshot: Snapshot) -> str:
+    """
+    Returns a snapshot as an attribute value.
+    """
+    data = {'version': SNAPSHOT_VERSION,
+            'paths': snapshot.paths,
+            'bits': base64.b64encode(snapshot.bits).decode('ascii')}
+    return base64.b64encode(zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))).decode('ascii')
+
+def decode(name: str, value: str) -> Snapshot:
+    """
+    Reads a snapshot from an attribute value written by `encode()`.
+    """
+    try:
+        data = json.loads(zlib.decompress(base64.b64decode(value)).decode('utf-8'))
+        if data['version'] != SNAPSHOT_VERSION:
+            raise SnapshotError(f'Snapshot {name} has unsupported version {data["version"]}')
+        return Snapshot(name, data['paths'], base64.b64decode(data['bits']))
+    except SnapshotError:
+        raise
+    except Exception as e:
+        raise SnapshotError(f'Snapshot {name} could not be read') from e
+
+def save(design, snapshot: Snapshot) -> None:
+    """
+    Stores a snapshot in the design's attributes, replacing any snapshot with the same name.
+    """
+    design.attributes.add(ATTRIBUTE_GROUP, snapshot.name, encode(snapshot))
+
+def load(design, name: str) -> Snapshot:
+    """
+    Returns a snapshot stored in the design. Raises `SnapshotError` if there is none by that name.
+    """
+    attribute = design.attributes.itemByName(ATTRIBUTE_GROUP, name)
+    if attribute is None:
+        raise SnapshotError(f'No snapshot named {name}')
+    return decode(name, attribute.value)
+
+def names(design) -> list:
+    """
+    Returns the names of the snapshots stored in the design, sorted. The snapshots are only
+    decoded when loaded.
+    """
+    return sorted(attribute.name for attribute in design.attributes.itemsByGroup(ATTRIBUTE_GROUP))
+
+def delete(design, name: str) -> bool:
+    """
+    Removes a snapshot from the design's attributes.
+
+    Returns: `True` if there was a snapshot by that name
+    """
+    attribute = design.attributes.itemByName(ATTRIBUTE_GROUP, name)
+    if attribute is None:
+        return False
+    attribute.deleteMe()
+    return True
@@ -0,0 +1,93 @@
+#views.py
+#
+# Named visibility views for Frame Tools, loaded from a JSON file. Each view has a default
+# visibility and a set of part number prefix rules; the longest matching prefix wins. Example:
+#
+#   {"name": "Frame View", "default": true, "rules": {"PN": false, "PN70": true}}
+#
+# shows everything except parts (PN...), but still shows the PN70 series.
+
+import json, os
+
+VIEWS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'views.json')
+
+class ViewConfigError(Exception):
+    pass
+
+class _TrieNode:
+    __slots__ = ('children', 'value')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.value = None
+
+class PrefixTrie:
+    """
+    Maps string prefixes to values, matching on the longest prefix.
+    """
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+
+    def insert(self, prefix: str, value) -> None:
+        node = self._root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        node.value = value
+
+    def longest_match(self, text: str, default=None):
+        """
+        Returns the value of the longest prefix of `text` in the trie, or `default` if none match.
+        """
+        node = self._root
+        result = default if node.value is None else node.value
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.value is not None:
+                result = node.value
+        return result
+
+class View:
+    """
+    A named set of visibility rules. Decisions are memoized per part number, so each unique part
+    is classified once no matter how many occurrences it has.
+    """
+    def __init__(self, name: str, default: bool = True, rules: dict = None) -> None:
+        self.name = name
+        self.default = default
+        self._trie = PrefixTrie()
+        for (prefix, visible) in (rules or {}).items():
+            self._trie.insert(prefix, bool(visible))
+        self._decisions = {}
+
+    def is_part_visible(self, part_number: str) -> bool:
+        try:
+            return self._decisions[part_number]
+        except KeyError:
+            visible = self._decisions[part_number] = self._trie.longest_match(part_number, self.default)
+            return visible
+
+    def is_visible(self, occurrence) -> bool:
+        """
+        Visibility test for `display.apply_visibility()`.
+        """
+        return self.is_part_visible(occurrence.component.partNumber)
+
+def load_views(filepath: str = VIEWS_FILE) -> list:
+    """
+    Reads the named views from a JSON file.
+
+    filepath: A string with the full file path and name.
+
+    Returns: a `list` of `View`s, in file order
+    """
+    try:
+        with open(filepath, 'r') as viewfile:
+            data = json.load(viewfile)
+        return [View(item['name'], item.get('default', True), item.get('rules')) for item in data['views']]
+    except Exception as e:
+        raise ViewConfigError(f'Failed to load views from {filepath}') from e
@@ -2,7 +2,7 @@
 # This module serves as a way to share variables across different
 # modules (global variables).
 
-import os
+import logging, os
 
 # Flag that indicates to run in Debug mode or not. When running in Debug mode
 # more information is written to the Text Command window. Generally, it's useful
@@ -10,6 +10,11 @@ import os
 # are ready to distribute it.
 DEBUG = True
 
+# Flag that enables per-stage timing and memory tracing of slow operations, e.g. BOM exports.
+# Summaries go to the Text Command window and Chrome trace files to TRACE_PATH. Tracing runs
+# `tracemalloc`, which slows everything down, so it is off even in Debug mode.
+TRACE = False
+
 # Gets the name of the add-in from the name of the folder the py file is in.
 # This is used when defining unique internal names for various UI elements 
 # that need a unique name. It's also recommended to use a company name as 
@@ -18,6 +23,27 @@ ADDIN_PATH = os.path.dirname(__file__)
 ADDIN_NAME = os.path.basename(ADDIN_PATH)
 ADDIN_PREFIX = 'clk3'
 
+# Folder for data cached between sessions, e.g. parsed source files
+CACHE_PATH = os.path.join(ADDIN_PATH, 'cache')
+
+# Source files at least this large are not parsed up front. They are indexed instead, and only the
+# rows a BOM needs are read (see commands/bomDialog/lazy_catalog.py).
+LAZY_CATALOG_SIZE = 64 * 1024 * 1024
+
+# Log file settings, see logger.py. Records below LOG_LEVEL are dropped before they are formatted.
+LOG_LEVEL = logging.DEBUG if DEBUG else logging.INFO
+LOG_PATH = os.path.join(ADDIN_PATH, 'logs')
+LOG_FILE_SIZE = 1024 * 1024
+LOG_FILE_COUNT = 3
+# Most records queued for the log file or kept for logger.dump()
+LOG_BUFFER_SIZE = 2000
+# Seconds between writes to the log file
+LOG_FLUSH_INTERVAL = 1.0
+
+# Folder for trace files written when TRACE is enabled. Only the newest TRACE_FILE_COUNT are kept.
+TRACE_PATH = os.path.join(ADDIN_PATH, 'traces')
+TRACE_FILE_COUNT = 20
+
 PANEL_ID = 'Clock3Panel'
 PANEL_NAME = 'Clock 3 Tools'
 PANEL_DESCRIPTIOPN = 'Tools for the Clock 3 project.'
@@ -29,7 +55,4 @@ WORKSPACE_ID = 'FusionSolidEnvironment'
 PART_PREFIX = 'PN'
 MATERIAL_PREFIX = 'MN'
 SUPPLY_PREFIX = 'UN'
-
-def local_icon_folder(script_filename) -> str:
-    return os.path.join(os.path.dirname(os.path.abspath(script_filename)), 'resources')
     
\ No newline at end of file
@@ -0,0 +1,151 @@
+# Buffered, leveled logging for the add-in.
+#
+# Modules log through the standard `logging` module, with `logging.getLogger(__name__)`. Every
+# module of the add-in is under the `config.ADDIN_NAME` package, so `start()` configures them all:
+#
+# - Records below `config.LOG_LEVEL` are dropped by `logging` before a record is even created. Pass
+#   values as arguments (`log.debug('Index is %d', index)`) rather than an f-string, so messages
+#   are only formatted if they are written.
+# - Records that pass are appended to a bounded ring buffer, which is all the calling thread does.
+#   A background thread formats them and writes them to a rotating file in `config.LOG_PATH`. If
+#   the writer falls behind, the oldest records are dropped, so an event handler never waits on
+#   the file. Arguments are formatted later on that thread, so they must not be changed after
+#   the call.
+# - The most recent records are also kept in memory. `dump()` returns them, e.g. to show the
+#   events that led up to an error in the Text Command window.
+
+import logging, os, threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from . import config
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(threadName)s %(name)s: %(message)s'
+LOG_FILENAME = 'clock3.log'
+
+class RingBufferHandler(logging.Handler):
+    """
+    Queues records for a `target` handler, which is called on a background thread.
+
+    capacity: The most records queued or kept for `dump()`; older ones are dropped.
+    flush_interval: Seconds between writes. Records at `logging.ERROR` or above are written at once.
+    """
+    def __init__(self, target: logging.Handler, capacity: int, flush_interval: float) -> None:
+        super().__init__()
+        self.target = target
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # Appending to and popping from a `deque` are atomic, so `emit()` needs no lock of its own
+        self._pending = deque(maxlen=capacity)
+        self._recent = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='logWriter', daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(record)
+        self._recent.append(record)
+        if record.levelno >= logging.ERROR:
+            self._wake.set()
+
+    def recent(self) -> list:
+        """
+        Returns the most recent records, oldest first.
+        """
+        return list(self._recent)
+
+    def flush(self) -> None:
+        """
+        Writes every queued record now, on the calling thread.
+        """
+        with self._write_lock:
+            pending = self._pending
+            while pending:
+                record = pending.popleft()
+                try:
+                    self.target.handle(record)
+                except Exception:
+                    self.target.handleError(record)
+            if self.dropped:
+                dropped = self.dropped
+                self.dropped = 0
+                self.target.handle(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': '%d log records dropped', 'args': (dropped,)}))
+            self.target.flush()
+
+    def close(self) -> None:
+        """
+        Stops the background thread, writes what is left and closes the target.
+        """
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self.target.close()
+        super().close()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+_handler = None
+
+def start() -> None:
+    """
+    Sends the add-in's log records to the ring buffer and its rotating log file. Call once from
+    `run()`. If the log folder cannot be created, records go wherever `logging` sends them by default.
+    """
+    global _handler
+    if _handler is not None:
+        return
+    log = logging.getLogger(config.ADDIN_NAME)
+    log.setLevel(config.LOG_LEVEL)
+    try:
+        os.makedirs(config.LOG_PATH, exist_ok=True)
+        target = RotatingFileHandler(os.path.join(config.LOG_PATH, LOG_FILENAME),
+                                     maxBytes=config.LOG_FILE_SIZE,
+                                     backupCount=config.LOG_FILE_COUNT,
+                                     encoding='utf-8')
+    except OSError:
+        return
+    target.setFormatter(logging.Formatter(LOG_FORMAT))
+    _handler = RingBufferHandler(target, config.LOG_BUFFER_SIZE, config.LOG_FLUSH_INTERVAL)
+    log.addHandler(_handler)
+    # Fusion runs every add-in in one interpreter; keep our records out of the others' handlers
+    log.propagate = False
+
+def stop() -> None:
+    """
+    Writes any queued records and stops the background thread. Call from `stop()`.
+    """
+    global _handler
+    if _handler is None:
+        return
+    log = logging.getLogger(config.ADDIN_NAME)
+    log.removeHandler(_handler)
+    log.propagate = True
+    _handler.close()
+    _handler = None
+
+def dump(count: int = 50) -> str:
+    """
+    Formats the most recent log records, e.g. to show with an error message. Queued records are
+    also written to the log file now, so it is complete if the add-in is about to fail.
+
+    count: The most records to include.
+
+    Returns: one line per record, oldest first, or an empty string if logging was not started
+    """
+    handler = _handler
+    if handler is None:
+        return ''
+    handler.flush()
+    formatter = handler.target.formatter
+    return '\n'.join(formatter.format(record) for record in handler.recent()[-count:])
@@ -0,0 +1,35 @@
+#conftest.py
+#
+# The add-in is imported as a package, by its folder name, against the stand-ins for `adsk` in
+# `benchmarks/fake_adsk.py`, so the tests run with a plain Python 3 interpreter:
+#
+#   python -m pytest tests
+
+import importlib, os, sys
+
+import pytest
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+ADDIN_PATH = os.path.dirname(TESTS_PATH)
+PACKAGE = os.path.basename(ADDIN_PATH)
+
+sys.path.insert(0, os.path.join(ADDIN_PATH, 'benchmarks'))
+sys.path.insert(0, os.path.dirname(ADDIN_PATH))
+
+import fake_adsk
+fake_adsk.install()
+
+def addin_module(name: str):
+    """
+    Imports a module of the add-in by its dotted path, e.g. 'commands.bomDialog.bom'.
+    """
+    return importlib.import_module(f'{PACKAGE}.{name}')
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    """
+    Keeps the caches' files out of the add-in folder.
+    """
+    path = os.path.join(tmp_path, 'cache')
+    monkeypatch.setattr(addin_module('config'), 'CACHE_PATH', path)
+    return path
@@ -0,0 +1,24 @@
+#test_atomic_write.py
+
+import os, pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import addin_module
+
+atomic_write = addin_module('commands.bomDialog.atomic_write')
+
+def test_dump_pickle_concurrent_writers(tmp_path):
+    path = os.path.join(tmp_path, 'cache', 'data.cache')
+    data = {f'PN{index:05d}': index for index in range(20000)}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(lambda _: atomic_write.dump_pickle(path, data), range(32)))
+    with open(path, 'rb') as datafile:
+        assert pickle.load(datafile) == data
+    assert os.listdir(os.path.dirname(path)) == ['data.cache']
+
+def test_dump_pickle_failure_leaves_no_file(tmp_path):
+    # The destination is a folder, so the final replace fails
+    path = os.path.join(tmp_path, 'data.cache')
+    os.makedirs(os.path.join(path, 'blocker'))
+    assert not atomic_write.dump_pickle(path, [1, 2, 3])
+    assert os.listdir(tmp_path) == ['data.cache']
@@ -0,0 +1,32 @@
+#test_batch.py
+
+import os
+
+import synthetic
+from conftest import addin_module
+
+batch = addin_module('commands.bomDialog.batch')
+bom = addin_module('commands.bomDialog.bom')
+pipeline = addin_module('commands.bomDialog.pipeline')
+
+def test_structure_snapshot_to_csv(tmp_path):
+    root = synthetic.build_assembly(2000)
+    part_ids = sorted({record['ID'] for record in bom.rollup_model_data(root)})
+    source_path = os.path.join(tmp_path, 'source.csv')
+    synthetic.write_catalog(source_path, 100, part_ids)
+
+    # Written the way the dialog writes a snapshot of the whole design
+    (records, structure) = bom.model_structure(root)
+    snapshot_path = os.path.join(tmp_path, 'variant.c3snap')
+    pipeline.ExportJob(records, [], [(pipeline.FORMAT_SNAPSHOT, snapshot_path)], structure=structure).run()
+
+    out_dir = os.path.join(tmp_path, 'out')
+    os.makedirs(out_dir)
+    result = batch.run_variant(snapshot_path, [source_path], out_dir)
+    assert result['status'] == pipeline.STATUS_DONE, result
+
+    # The same BOM exported straight from the model
+    expected_path = os.path.join(tmp_path, 'expected.csv')
+    pipeline.ExportJob(bom.rollup_model_data(root), [source_path], [(pipeline.FORMAT_CSV, expected_path)]).run()
+    with open(os.path.join(out_dir, 'variant.csv'), 'rb') as actual, open(expected_path, 'rb') as expected:
+        assert actual.read() == expected.read()
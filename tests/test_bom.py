@@ -0,0 +1,103 @@
+#test_bom.py
+
+import io, random
+
+import synthetic
+from conftest import addin_module
+
+bom = addin_module('commands.bomDialog.bom')
+data_parser = addin_module('commands.bomDialog.data_parser')
+
+SEEDS = range(5)
+
+def by_component(records: list) -> dict:
+    """
+    Returns records keyed on component, with the fields compared between counting methods.
+    """
+    result = {}
+    for record in records:
+        key = bom.component_key(record['component'])
+        assert key not in result
+        result[key] = (record['ID'], record['name'], record['count'])
+    return result
+
+def test_rollup_matches_flattened_count():
+    for seed in SEEDS:
+        root = synthetic.build_assembly(3000, seed)
+        assert by_component(bom.rollup_model_data(root)) == by_component(bom.extract_model_data(root.allOccurrences))
+        # An active subassembly is counted the same way
+        sub = next(occ.component for occ in root.occurrences if len(occ.component.occurrences))
+        assert by_component(bom.rollup_model_data(sub)) == by_component(bom.extract_model_data(sub.allOccurrences))
+
+def random_selection(root, rng: random.Random) -> list:
+    occurrences = list(root.allOccurrences)
+    selection = rng.sample(occurrences, 40)
+    # Subassemblies selected together with some of what is inside them
+    for occ in rng.sample([occ for occ in root.occurrences if len(occ.component.occurrences)], 5):
+        prefix = occ.fullPathName + '+'
+        inside = [item for item in occurrences if item.fullPathName.startswith(prefix)]
+        selection.append(occ)
+        selection.extend(rng.sample(inside, min(3, len(inside))))
+    rng.shuffle(selection)
+    # Selecting the same occurrence twice counts it once
+    return selection + rng.sample(selection, 5)
+
+def test_collapse_selection_keeps_outermost():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        selection = random_selection(synthetic.build_assembly(3000, seed), rng)
+        paths = {occ.fullPathName for occ in selection}
+        expected = []
+        seen = set()
+        for occ in selection:
+            path = occ.fullPathName
+            if path in seen or any(path.startswith(other + '+') for other in paths):
+                continue
+            seen.add(path)
+            expected.append(occ)
+        assert bom.collapse_selection(selection) == expected
+
+def test_selection_matches_flattened_count():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        selection = random_selection(synthetic.build_assembly(3000, seed), rng)
+        flattened = []
+        for occ in bom.collapse_selection(selection):
+            flattened.append(occ)
+            flattened.extend(occ.component.allOccurrences)
+        assert by_component(bom.selection_model_data(selection)) == by_component(bom.extract_model_data(flattened))
+
+def read_source(rows: list) -> dict:
+    text = '\r\n'.join(','.join(row) for row in rows) + '\r\n'
+    return data_parser.read_source_data(io.StringIO(text, newline=''))
+
+SOURCE = [
+    ('PN001', 'Frame', 'Extrusion', 'ea', '', '', '', '', '', ''),
+    ('PN002', 'Hardware', 'Tee nut', 'ea', '8', '', '', '', '', ''),
+    ('MN001', 'Materials', 'Filament', 'g', '250', '', '', '', '', ''),
+    ('UN001', 'Supplies', 'Grease', 'ml', '10', '', '', '', '', ''),
+]
+
+def test_merge_sums_duplicate_model_ids():
+    parts = read_source(SOURCE)
+    model = [{'ID': 'PN001', 'name': 'Extrusion 100', 'count': 4},
+             {'ID': 'PN001', 'name': 'Extrusion 200', 'count': 3},
+             {'ID': 'PN404', 'name': 'Unknown', 'count': 1}]
+    (merged, problems) = bom.merge_source_data(model, parts)
+    assert merged['PN001']['Qty'] == 7
+    assert problems == ['PN404']
+
+def test_merge_filters_defaults_by_type():
+    parts = read_source(SOURCE)
+    model = [{'ID': 'PN002', 'name': 'Tee nut', 'count': 20}]
+    for include_materials in (True, False):
+        for include_supplies in (True, False):
+            (merged, problems) = bom.merge_source_data(model, parts, include_materials, include_supplies)
+            expected = ['PN002'] + ['MN001'] * include_materials + ['UN001'] * include_supplies
+            assert sorted(merged) == sorted(expected)
+            # Model counts replace the default quantity
+            assert merged['PN002']['Qty'] == 20
+            assert problems == []
+    (merged, _) = bom.merge_source_data([], parts)
+    assert [(part_id, part['Qty']) for (part_id, part) in merged.items()] == \
+        [('MN001', 250), ('PN002', 8), ('UN001', 10)]
@@ -0,0 +1,43 @@
+#test_frame_snapshots.py
+
+import pytest
+
+import fake_adsk
+import synthetic
+from conftest import addin_module
+
+snapshots = addin_module('commands.frameHelper.snapshots')
+
+def test_save_load_delete():
+    design = fake_adsk.Design(synthetic.build_assembly(200))
+    occurrences = design.rootComponent.allOccurrences
+    snapshots.save(design, snapshots.capture('frame', occurrences))
+    snapshots.save(design, snapshots.capture('nuts', occurrences))
+    assert snapshots.names(design) == ['frame', 'nuts']
+    assert snapshots.load(design, 'frame').paths == [item.fullPathName for item in occurrences]
+
+    assert snapshots.delete(design, 'frame')
+    assert not snapshots.delete(design, 'frame')
+    assert snapshots.names(design) == ['nuts']
+    with pytest.raises(snapshots.SnapshotError):
+        snapshots.load(design, 'frame')
+
+def test_restore_writes_only_changes():
+    design = fake_adsk.Design(synthetic.build_assembly(500))
+    occurrences = list(design.rootComponent.allOccurrences)
+    for occurrence in occurrences[::3]:
+        occurrence.isLightBulbOn = False
+    snapshot = snapshots.capture('view', occurrences)
+    expected = [occurrence.isLightBulbOn for occurrence in occurrences]
+    for occurrence in occurrences[::2]:
+        occurrence.isLightBulbOn = not occurrence.isLightBulbOn
+    changed = len(occurrences[::2])
+    assert snapshots.restore(snapshot, occurrences) == (changed, len(occurrences) - changed, 0)
+    assert [occurrence.isLightBulbOn for occurrence in occurrences] == expected
+
+    # Occurrences missing from the snapshot are left alone
+    added = fake_adsk.Occurrence(occurrences[0].component, 'added')
+    added.isLightBulbOn = False
+    (written, _, unknown) = snapshots.restore(snapshot, [added] + occurrences[::-1])
+    assert (written, unknown) == (0, 1)
+    assert not added.isLightBulbOn
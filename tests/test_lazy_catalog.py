@@ -0,0 +1,52 @@
+#test_lazy_catalog.py
+
+import os
+
+import synthetic
+from conftest import addin_module
+
+bom = addin_module('commands.bomDialog.bom')
+data_parser = addin_module('commands.bomDialog.data_parser')
+lazy_catalog = addin_module('commands.bomDialog.lazy_catalog')
+
+def write_source(tmp_path, seed: int) -> tuple:
+    """
+    Writes a catalog for a synthetic model, plus rows that are awkward to index: a quoted newline,
+    a short row and an ID listed twice, whose second row wins.
+
+    Returns: a `tuple` of the source path and the model's part records
+    """
+    model_parts = bom.rollup_model_data(synthetic.build_assembly(3000, seed))
+    path = os.path.join(tmp_path, f'source{seed}.csv')
+    synthetic.write_catalog(path, 2000, sorted({part['ID'] for part in model_parts}), seed)
+    with open(path, 'a', newline='') as datafile:
+        datafile.write('PN900000,Frame,"Two\r\nlines",ea,2,,,,,\r\n')
+        datafile.write('PN900001,Frame,Short\r\n')
+        datafile.write(f'{model_parts[0]["ID"]},Frame,Replaced,ea,5,,,,,\r\n')
+    return (path, model_parts)
+
+def test_lazy_catalog_matches_full_parse(tmp_path):
+    for seed in range(3):
+        (path, model_parts) = write_source(tmp_path, seed)
+        for include_defaults in (True, False):
+            parsed = data_parser.import_source_data(path, include_defaults)
+            catalog = lazy_catalog.open_catalog(path, include_defaults)
+            try:
+                assert list(catalog) == list(parsed)
+                assert all(catalog[part_id] == part for (part_id, part) in parsed.items())
+                assert list(catalog.defaults) == bom.default_ids(parsed)
+                assert bom.merge_source_data(model_parts, catalog) == bom.merge_source_data(model_parts, parsed)
+            finally:
+                catalog.close()
+
+def test_index_is_reused_from_disk(tmp_path):
+    (path, model_parts) = write_source(tmp_path, 0)
+    first = lazy_catalog.open_catalog(path)
+    first.close()
+    # A fresh index read back from the cache folder gives the same catalog
+    second = lazy_catalog.LazyCatalog(lazy_catalog._read_index(os.path.normcase(os.path.abspath(path))))
+    try:
+        assert list(second) == list(first)
+        assert bom.merge_source_data(model_parts, second) == bom.merge_source_data(model_parts, first)
+    finally:
+        second.close()
@@ -0,0 +1,100 @@
+#test_live_bom.py
+#
+# Replays add, remove and replace event streams against a stand-in design and checks the live
+# counts against a full roll-up after every event.
+
+import random
+
+import fake_adsk, synthetic
+from conftest import addin_module
+
+bom = addin_module('commands.bomDialog.bom')
+live_bom = addin_module('commands.bomDialog.live_bom')
+
+def counts(records: list) -> dict:
+    return {bom.component_key(record['component']): record['count'] for record in records}
+
+def expected(root) -> dict:
+    return counts(bom.rollup_model_data(root))
+
+def make_design(seed: int = 0):
+    """
+    Returns a root component, a pool of components to place in it and a started `LiveBom`.
+    """
+    root = synthetic.build_assembly(500, seed)
+    pool = {}
+    for occ in root.allOccurrences:
+        pool[occ.component.entityToken] = occ.component
+    live = live_bom.LiveBom(root)
+    live.parts()
+    return (root, list(pool.values()), live)
+
+def new_occurrence(component, tokens: list):
+    tokens.append(len(tokens))
+    return fake_adsk.Occurrence(component, f'added{len(tokens)}')
+
+def test_event_stream_matches_rollup():
+    (root, pool, live) = make_design()
+    rng = random.Random(1)
+    tokens = []
+    for _ in range(300):
+        action = rng.choice(('add', 'remove', 'replace'))
+        if action == 'add' or not root.occurrences:
+            occ = new_occurrence(rng.choice(pool), tokens)
+            root.occurrences.append(occ)
+            live.occurrence_added(occ)
+        elif action == 'remove':
+            occ = root.occurrences.pop(rng.randrange(len(root.occurrences)))
+            live.occurrence_removed(occ.entityToken)
+        else:
+            occ = rng.choice(root.occurrences)
+            occ.component = rng.choice(pool)
+            live.occurrence_replaced(occ.entityToken, occ)
+        assert counts(live.parts()) == expected(root)
+    assert live.rebuild_count == 1
+
+def test_sync_applies_changes_without_rebuilding():
+    (root, pool, live) = make_design(2)
+    rng = random.Random(3)
+    tokens = []
+    for _ in range(50):
+        root.occurrences.append(new_occurrence(rng.choice(pool), tokens))
+        del root.occurrences[rng.randrange(len(root.occurrences))]
+        rng.choice(root.occurrences).component = rng.choice(pool)
+        live.mark_changed()
+        assert counts(live.parts()) == expected(root)
+    assert live.rebuild_count == 1
+
+def test_mark_changed_defers_sync():
+    (root, pool, live) = make_design()
+    changes = live.change_count
+    root.occurrences.append(new_occurrence(pool[0], []))
+    live.mark_changed()
+    assert live.needs_sync and live.change_count == changes
+    assert counts(live.parts()) == expected(root)
+    assert not live.needs_sync and live.change_count == changes + 1
+
+def test_nested_occurrence_forces_rebuild():
+    (root, pool, live) = make_design()
+    parent = next(occ for occ in root.occurrences if len(occ.component.occurrences))
+    child = fake_adsk.Occurrence(pool[0], 'nested', parent, f'{parent.fullPathName}+nested')
+    parent.component.occurrences.append(fake_adsk.Occurrence(pool[0], 'nested'))
+    live.occurrence_added(child)
+    assert live.needs_rebuild
+    assert counts(live.parts()) == expected(root)
+    assert live.rebuild_count == 2
+
+def test_changed_revision_forces_rebuild():
+    (root, pool, live) = make_design()
+    sub = next(occ.component for occ in root.occurrences if len(occ.component.occurrences))
+    sub.occurrences.append(fake_adsk.Occurrence(pool[0], 'edited'))
+    sub.revisionId = 'r1'
+    live.mark_changed()
+    assert counts(live.parts()) == expected(root)
+    assert live.rebuild_count == 2
+
+def test_unknown_removal_forces_rebuild():
+    (root, pool, live) = make_design()
+    live.occurrence_removed('not-tracked')
+    assert live.needs_rebuild
+    assert counts(live.parts()) == expected(root)
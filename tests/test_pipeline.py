@@ -0,0 +1,52 @@
+#test_pipeline.py
+
+import os, threading
+
+from conftest import addin_module
+
+pipeline = addin_module('commands.bomDialog.pipeline')
+
+PARTS = [{'ID': 'PN100', 'name': 'Part', 'count': 2}]
+
+class BlockingJob(pipeline.ExportJob):
+    """
+    A job that waits for `release` before it runs, to hold the worker thread.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def run(self) -> dict:
+        self.started.set()
+        self.release.wait()
+        return super().run()
+
+def test_jobs_queue_behind_running_job(tmp_path):
+    paths = [os.path.join(tmp_path, name) for name in ('a.c3snap', 'b.c3snap')]
+    first = BlockingJob(PARTS, [], [(pipeline.FORMAT_SNAPSHOT, paths[0])])
+    second = pipeline.ExportJob(PARTS, [], [(pipeline.FORMAT_SNAPSHOT, paths[1])])
+    results = []
+    futures = [pipeline.submit(first, results.append)]
+    first.started.wait()
+    futures.append(pipeline.submit(second, results.append))
+    assert pipeline.is_running()
+    first.release.set()
+    for future in futures:
+        future.result()
+    assert [result['status'] for result in results] == [pipeline.STATUS_DONE, pipeline.STATUS_DONE]
+    assert all(os.path.exists(path) for path in paths)
+    assert not pipeline.is_running()
+
+def test_cancel_drops_queued_jobs(tmp_path):
+    first = BlockingJob(PARTS, [], [(pipeline.FORMAT_SNAPSHOT, os.path.join(tmp_path, 'a.c3snap'))])
+    second = pipeline.ExportJob(PARTS, [], [(pipeline.FORMAT_SNAPSHOT, os.path.join(tmp_path, 'b.c3snap'))])
+    results = []
+    futures = [pipeline.submit(first, results.append)]
+    first.started.wait()
+    futures.append(pipeline.submit(second, results.append))
+    pipeline.cancel()
+    first.release.set()
+    for future in futures:
+        future.result()
+    assert [result['status'] for result in results] == [pipeline.STATUS_CANCELLED, pipeline.STATUS_CANCELLED]
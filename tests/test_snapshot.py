@@ -0,0 +1,29 @@
+#test_snapshot.py
+
+import os
+
+import synthetic
+from conftest import addin_module
+
+bom = addin_module('commands.bomDialog.bom')
+snapshot = addin_module('commands.bomDialog.snapshot')
+config = addin_module('config')
+
+def test_structure_indexes_loaded_records(tmp_path):
+    (records, structure) = bom.model_structure(synthetic.build_assembly(500))
+    assert any(not record['ID'].startswith(config.PART_PREFIX) for record in records)
+    for name in ('model.c3snap', 'model.json'):
+        path = os.path.join(tmp_path, name)
+        snapshot.save_snapshot(path, records, 'model', structure)
+        data = snapshot.load_snapshot(path)
+        assert [tuple(edge) for edge in data['structure']] == structure
+        assert data['parts'] == records
+
+def test_parts_without_structure_are_part_numbers(tmp_path):
+    (records, _) = bom.model_structure(synthetic.build_assembly(500))
+    for name in ('model.c3snap', 'model.json'):
+        path = os.path.join(tmp_path, name)
+        snapshot.save_snapshot(path, records, 'model')
+        data = snapshot.load_snapshot(path)
+        assert data['structure'] is None
+        assert data['parts'] == [record for record in records if record['ID'].startswith(config.PART_PREFIX)]
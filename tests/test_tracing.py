@@ -0,0 +1,22 @@
+#test_tracing.py
+
+import os
+
+from conftest import addin_module
+
+config = addin_module('config')
+tracing = addin_module('tracing')
+
+def test_only_newest_trace_files_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'TRACE_PATH', str(tmp_path))
+    monkeypatch.setattr(config, 'TRACE_FILE_COUNT', 3)
+    for index in range(5):
+        tracer = tracing.Tracer(f'op{index}')
+        with tracer.stage('work'):
+            sum(range(1000))
+        tracer.finish(log=False)
+        # Date each file in write order, however coarse the file system's clock
+        for name in os.listdir(tmp_path):
+            if name.startswith(f'op{index}-'):
+                os.utime(os.path.join(tmp_path, name), (index, index))
+    assert sorted(name.split('-')[0] for name in os.listdir(tmp_path)) == ['op2', 'op3', 'op4']
@@ -0,0 +1,154 @@
+# Per-stage timing and memory tracing.
+#
+# Wrap each stage of a slow operation in `tracer.stage(name)`. When tracing is enabled
+# (`config.TRACE`), wall time, call count and peak allocations are recorded per stage, and
+# `finish()` logs a summary and writes a Chrome trace-event file (open it in chrome://tracing or
+# https://ui.perfetto.dev); only the newest `config.TRACE_FILE_COUNT` files are kept. When
+# disabled, `start()` returns a shared tracer whose stages are a no-op context manager.
+#
+# Memory peaks come from `tracemalloc`, which is global: stages should not be nested, and stages
+# running at the same time on other threads are included in each other's peaks.
+
+import json, os, threading, time, tracemalloc
+from contextlib import nullcontext
+
+from . import config
+
+_NULL_STAGE = nullcontext()
+
+class _Stage:
+    __slots__ = ('tracer', 'name', 'start', 'start_memory')
+
+    def __init__(self, tracer, name: str) -> None:
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        end = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] - self.start_memory
+        self.tracer._record(self.name, self.start, end, peak)
+
+class Tracer:
+    """
+    Collects stage timings for one traced operation, e.g. one BOM export.
+    """
+    def __init__(self, name: str, enabled: bool = True) -> None:
+        self.name = name
+        self.enabled = enabled
+        self.stages = {}
+        self._events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._owns_tracemalloc = False
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def stage(self, name: str):
+        """
+        Returns a context manager that records the enclosed code as stage `name`.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _record(self, name: str, start: float, end: float, peak: int) -> None:
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0}
+            stats['calls'] += 1
+            stats['seconds'] += end - start
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+            self._events.append({
+                'name': name,
+                'cat': self.name,
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {'peak_kb': peak // 1024}
+            })
+
+    def summary(self) -> str:
+        """
+        Returns one line per stage with its total time, call count and peak allocations.
+        """
+        if not self.enabled:
+            return ''
+        lines = [f'{self.name} trace:']
+        for (name, stats) in self.stages.items():
+            lines.append(f'  {name}: {stats["seconds"] * 1000:.1f} ms, {stats["calls"]} call(s), '
+                         f'peak {stats["peak_bytes"] / 1024:.0f} KB')
+        return '\n'.join(lines)
+
+    def write_chrome_trace(self, filepath: str) -> None:
+        with self._lock:
+            events = list(self._events)
+        with open(filepath, 'w') as outfile:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, outfile)
+
+    def finish(self, log: bool = True) -> str:
+        """
+        Stops tracing and writes the Chrome trace file to `config.TRACE_PATH`, deleting the oldest
+        files beyond `config.TRACE_FILE_COUNT`. If `log` is `True`,
+        the summary is also written with `futil.log`; pass `False` off the main thread and log the
+        returned summary later.
+
+        Returns: the summary, or an empty string if tracing is disabled
+        """
+        if not self.enabled:
+            return ''
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        summary = self.summary()
+        try:
+            os.makedirs(config.TRACE_PATH, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            self.write_chrome_trace(os.path.join(config.TRACE_PATH, f'{self.name}-{stamp}.json'))
+            prune_traces(config.TRACE_FILE_COUNT)
+        except OSError:
+            pass
+        if log:
+            log_summary(summary)
+        return summary
+
+DISABLED = Tracer('disabled', enabled=False)
+
+def start(name: str) -> Tracer:
+    """
+    Starts tracing an operation. Returns `DISABLED` unless `config.TRACE` is set.
+    """
+    if not config.TRACE:
+        return DISABLED
+    return Tracer(name)
+
+def prune_traces(keep: int) -> None:
+    """
+    Deletes all but the `keep` most recently written trace files in `config.TRACE_PATH`.
+    """
+    with os.scandir(config.TRACE_PATH) as entries:
+        traces = [(entry.stat().st_mtime_ns, entry.path) for entry in entries
+                  if entry.is_file() and entry.name.endswith('.json')]
+    traces.sort()
+    for (_, path) in traces[:max(0, len(traces) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def log_summary(summary: str) -> None:
+    """
+    Writes a summary from `Tracer.finish()` to the Text Command window. Call on the main thread.
+    """
+    if summary:
+        from .lib import fusion360utils as futil
+        futil.log(summary)